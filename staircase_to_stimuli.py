@@ -1,16 +1,43 @@
 
+import re
+
 import pandas as pd
 import numpy as np
 from typing import Dict, Tuple, Optional
 
+import matplotlib
 import matplotlib.pyplot as plt
 
+try:
+    from scipy.special import xlogy
+    from scipy.stats import t as tdist
+except ImportError:  # only needed for fitting, which reports the missing SciPy itself
+    xlogy = None
+    tdist = None  # CIs fall back to the normal 1.96
+
 PRACTICE_COLS = ['center', 'surround', 'type', 'surr_type', 'surr_opacity']
 SURROUND_ORDER = ['noss','poss','negs']
 
+# built once at import: the text after a staircase label's last '_' (the whole label
+# if it has none, as split('_').str[-1] gave), MoCS row filters
+_SURR_RE = re.compile(r'([^_]+)$')
+_VALID_MOCS_TYPES = frozenset({'m3','m2','m1','PSE','p1','p2','p3'})
+_VALID_RESPS = frozenset({'left','right'})
+
+# only these columns are parsed from the (wide) PsychoPy data files; intensities and
+# centers stay float64 since the MoCS logistic fits are poorly conditioned and move under float32
+STAIRCASE_DTYPES = {'trials.label': 'string', 'trials.intensity': 'float64',
+                    'blocks.thisRepN': 'float64', 'blocks.thisN': 'float64'}
+MOCS_DTYPES = {'type': 'string', 'surr_type': 'string',
+               'resp.keys': 'string', 'center': 'float64'}
+
 # ------------------------------
 # Helpers
 # ------------------------------
+def _read_csv_columns(path: str, dtypes: Dict[str, str]) -> pd.DataFrame:
+    # absent columns are skipped here and reported by the per-analysis checks
+    return pd.read_csv(path, usecols=lambda c: c in dtypes, dtype=dtypes)
+
 def _infer_block_column(df: pd.DataFrame) -> Optional[str]:
     for c in ['blocks.thisRepN', 'blocks.thisN']:
         if c in df.columns and df[c].notna().any():
@@ -20,19 +47,14 @@ def _infer_block_column(df: pd.DataFrame) -> Optional[str]:
 def _extract_surround_from_label(df: pd.DataFrame) -> pd.Series:
     if 'trials.label' not in df.columns:
         raise ValueError("Missing required column 'trials.label'.")
-    return df['trials.label'].astype(str).str.split('_').str[-1]
+    surr = df['trials.label'].astype('string').str.extract(_SURR_RE, expand=False)
+    return pd.Series(pd.Categorical(surr, categories=SURROUND_ORDER), index=df.index)
 
 def _ensure_required_trial_cols(df: pd.DataFrame):
     missing = [c for c in ['trials.label','trials.intensity'] if c not in df.columns]
     if missing:
         raise ValueError(f"Missing required column(s): {missing}")
 
-def _last_k_mean(series: pd.Series, k: int) -> float:
-    if series.empty:
-        return float('nan')
-    k_eff = min(k, len(series))
-    return float(series.tail(k_eff).mean())
-
 # ------------------------------
 # PSEs from staircase data
 # ------------------------------
@@ -61,27 +83,30 @@ def pse_last_k_per_block_per_condition(df: pd.DataFrame, k: int = 6) -> Tuple[pd
     else:
         d['_block_id'] = df[block_col]
 
-    rows = []
-    for bid, g_block in d.groupby('_block_id', dropna=False):
-        g_block = g_block.sort_index()  # preserve run order
-        for cond in SURROUND_ORDER:
-            g = g_block[g_block['surround'] == cond]
-            n_avail = int(g.shape[0])
-            mean_last = _last_k_mean(g['trials.intensity'], k)
-            rows.append({
-                'block_id': bid if pd.notna(bid) else 'NA',
-                'condition': cond,
-                'n_trials_available': n_avail,
-                'n_used': min(k, n_avail),
-                'mean_last_k': mean_last
-            })
-    per_block = pd.DataFrame(rows)
+    # one stable sort into run (index) order for the whole frame; groupby keeps that
+    # order within each group, so tail(k) is the last k trials
+    d = d.sort_index(kind='stable')
+    keys = ['_block_id', 'surround']
+    full_index = pd.MultiIndex.from_product([pd.unique(d['_block_id']), SURROUND_ORDER], names=keys)
+    n_avail = (d.groupby(keys, sort=False, dropna=False, observed=True).size()
+                .reindex(full_index, fill_value=0).to_numpy())
+    mean_last = (d.groupby(keys, sort=False, dropna=False, observed=True).tail(k)
+                  .groupby(keys, sort=False, dropna=False, observed=True)['trials.intensity'].mean()
+                  .reindex(full_index).to_numpy())
+    per_block = pd.DataFrame({
+        'block_id': full_index.get_level_values('_block_id'),
+        'condition': full_index.get_level_values('surround'),
+        'n_trials_available': n_avail,
+        'n_used': np.minimum(k, n_avail),
+        'mean_last_k': mean_last
+    })
+    per_block['block_id'] = per_block['block_id'].where(per_block['block_id'].notna(), 'NA')
     per_block['condition'] = pd.Categorical(per_block['condition'], categories=SURROUND_ORDER, ordered=True)
     per_block = per_block.sort_values(['block_id','condition']).reset_index(drop=True)
 
-    coll = (per_block.groupby('condition', as_index=False)
+    coll = (per_block.groupby('condition', as_index=False, observed=True)
             .agg(PSE=('mean_last_k','mean'),
-                 n_blocks_used=('mean_last_k', lambda s: int(s.notna().sum()))))
+                 n_blocks_used=('mean_last_k','count')))
     coll['condition'] = pd.Categorical(coll['condition'], categories=SURROUND_ORDER, ordered=True)
     coll = coll.sort_values('condition').reset_index(drop=True)
     return per_block, coll
@@ -89,6 +114,19 @@ def pse_last_k_per_block_per_condition(df: pd.DataFrame, k: int = 6) -> Tuple[pd
 # ------------------------------
 # Stimuli from PSEs (practice_stims schema)
 # ------------------------------
+def _stim_block(centers: np.ndarray, surround: float, tnames: np.ndarray,
+                surr_type: str, surr_opacity: int, reps: int) -> Dict[str, np.ndarray]:
+    # column arrays for one surround condition, each offset's `reps` copies kept adjacent
+    reps = max(int(reps), 0)
+    n = len(centers) * reps
+    return {
+        'center': np.repeat(centers, reps),
+        'surround': np.full(n, surround),
+        'type': np.repeat(tnames, reps),
+        'surr_type': np.full(n, surr_type, dtype=object),
+        'surr_opacity': np.full(n, surr_opacity, dtype=np.int64)
+    }
+
 def make_stimuli_from_pse(
     pse_by_condition: Dict[str, float],
     step: float = 0.5,
@@ -105,6 +143,7 @@ def make_stimuli_from_pse(
       - 5-condition: m2, m1, PSE, p1, p2  (offsets = ±2*step and ±1*step)
       - 7-condition: m3, m2, m1, PSE, p1, p2, p3 (offsets = ±3*step, ±2*step, ±1*step)
     Naming: m1=1*step, m2=2*step, m3=3*step (and p1/p2/p3 accordingly)
+    'type' and 'surr_type' are ordered categoricals (rows sorted poss, negs, noss).
     """
     for key in ['poss','negs','noss']:
         if key not in pse_by_condition:
@@ -117,36 +156,27 @@ def make_stimuli_from_pse(
     else:
         raise ValueError('n_conditions must be 5 or 7')
 
-    rows = []
+    tnames = np.array([tname for tname, _ in offsets], dtype=object)
+    deltas = np.array([delta for _, delta in offsets], dtype=float)
 
     # poss
     pse = float(pse_by_condition['poss'])
-    for tname, delta in offsets:
-        level = abs(pse + delta)
-        for _ in range(int(reps_poss_negs)):
-            rows.append({'center': +level, 'surround': +abs(surround_mag), 'type': tname, 'surr_type': 'poss', 'surr_opacity': 100})
+    poss = _stim_block(+np.abs(pse + deltas), +abs(surround_mag), tnames, 'poss', 100, reps_poss_negs)
 
     # negs
     pse = float(pse_by_condition['negs'])
-    for tname, delta in offsets:
-        level = abs(pse + delta)
-        for _ in range(int(reps_poss_negs)):
-            rows.append({'center': -level, 'surround': -abs(surround_mag), 'type': tname, 'surr_type': 'negs', 'surr_opacity': 100})
+    negs = _stim_block(-np.abs(pse + deltas), -abs(surround_mag), tnames, 'negs', 100, reps_poss_negs)
 
     # noss (single sign based on PSE_noss)
     pse = float(pse_by_condition['noss'])
     base_sign = +1.0 if pse >= 0 else -1.0
-    for tname, delta in offsets:
-        level = base_sign * abs(pse + delta)
-        for _ in range(int(reps_noss)):
-            rows.append({'center': level, 'surround': 0, 'type': tname, 'surr_type': 'noss', 'surr_opacity': 0})
-
-    out = pd.DataFrame(rows, columns=PRACTICE_COLS)
-    type_order = {name:i for i, name in enumerate([lab for lab,_ in offsets])}
-    surr_order = {'poss':0,'negs':1,'noss':2}
-    out['__to'] = out['type'].map(type_order)
-    out['__so'] = out['surr_type'].map(surr_order)
-    out = out.sort_values(['__so','__to','center']).drop(columns=['__to','__so']).reset_index(drop=True)
+    noss = _stim_block(base_sign * np.abs(pse + deltas), 0, tnames, 'noss', 0, reps_noss)
+
+    out = pd.DataFrame({c: np.concatenate([poss[c], negs[c], noss[c]]) for c in PRACTICE_COLS},
+                       columns=PRACTICE_COLS)
+    out['type'] = pd.Categorical(out['type'], categories=list(tnames), ordered=True)
+    out['surr_type'] = pd.Categorical(out['surr_type'], categories=['poss','negs','noss'], ordered=True)
+    out = out.sort_values(['surr_type','type','center']).reset_index(drop=True)
     return out
 
 # ------------------------------
@@ -162,9 +192,9 @@ def build_trials_from_staircase(
     out_csv: Optional[str] = None,
     n_conditions: int = 5
 ) -> Tuple[pd.DataFrame, Dict[str, float], pd.DataFrame, pd.DataFrame, Optional[str]]:
-    df = pd.read_csv(csv_path)
+    df = _read_csv_columns(csv_path, STAIRCASE_DTYPES)
     per_block, collapsed = pse_last_k_per_block_per_condition(df, k=k)
-    pse_map = {row['condition']: float(row['PSE']) for _, row in collapsed.iterrows()}
+    pse_map = collapsed.set_index('condition')['PSE'].astype(float).to_dict()
     stim = make_stimuli_from_pse(pse_map, step=step, surround_mag=surround_mag,
                                  reps_poss_negs=reps_poss_negs, reps_noss=reps_noss,
                                  n_conditions=n_conditions)
@@ -180,24 +210,18 @@ def build_trials_from_staircase(
 # Variability across blocks (optional helper)
 # ------------------------------
 def summarize_pse_variability(per_block_df: pd.DataFrame) -> pd.DataFrame:
-    try:
-        from scipy.stats import t as tdist
-        t_ppf = lambda p, df: float(tdist.ppf(p, df))
-    except Exception:
-        import numpy as np
-        t_ppf = lambda p, df: 1.96
     g = per_block_df.dropna(subset=["mean_last_k"]).groupby("condition")["mean_last_k"]
     out = g.agg(n_blocks="count", mean="mean", sd="std").reset_index()
-    import numpy as np
     out["sem"] = out["sd"] / np.sqrt(out["n_blocks"].clip(lower=1))
-    out["ci95_lo"] = out.apply(
-        lambda r: r["mean"] - t_ppf(0.975, int(r["n_blocks"] - 1)) * r["sem"] if r["n_blocks"] >= 2 else np.nan,
-        axis=1
-    )
-    out["ci95_hi"] = out.apply(
-        lambda r: r["mean"] + t_ppf(0.975, int(r["n_blocks"] - 1)) * r["sem"] if r["n_blocks"] >= 2 else np.nan,
-        axis=1
-    )
+    # one vectorized t.ppf over all conditions; no CI with fewer than 2 blocks
+    n_blocks = out["n_blocks"].to_numpy()
+    if tdist is not None:
+        tcrit = tdist.ppf(0.975, np.maximum(n_blocks - 1, 1))
+    else:
+        tcrit = np.full(len(out), 1.96)
+    tcrit = np.where(n_blocks >= 2, tcrit, np.nan)
+    out["ci95_lo"] = out["mean"] - tcrit * out["sem"]
+    out["ci95_hi"] = out["mean"] + tcrit * out["sem"]
     return out
 
 # ------------------------------
@@ -208,21 +232,25 @@ def _clean_mocs_df(df: pd.DataFrame) -> pd.DataFrame:
     for c in required:
         if c not in df.columns:
             raise ValueError(f"MoCS file missing required column: {c}")
-    d = df.copy()
-    valid_types = {'m3','m2','m1','PSE','p1','p2','p3'}
-    d = d[d['type'].isin(valid_types)]
-    d = d[d['resp.keys'].isin(['left','right'])]
-    return d
-
-def _collect_values_tuple(series: pd.Series):
-    arr = pd.unique(series.dropna())
-    try:
-        arr = [float(x) for x in arr]
-    except Exception:
-        pass
-    arr = sorted(arr)
-    arr = [round(float(x), 3) for x in arr]
-    return tuple(arr)
+    # single combined mask, no up-front copy; callers that add columns use assign
+    mask = df['type'].isin(_VALID_MOCS_TYPES) & df['resp.keys'].isin(_VALID_RESPS)
+    return df.loc[mask]
+
+def _left_right_by_type(d: pd.DataFrame, by: str) -> pd.DataFrame:
+    # left/right counts per (type, by) cell from one crosstab, plus the centers used
+    ct = (pd.crosstab([d['type'], d[by]], d['resp.keys'])
+            .reindex(columns=['left','right'], fill_value=0))
+    out = pd.DataFrame({'n_left': ct['left'], 'n_right': ct['right']})
+    out['n'] = out['n_left'] + out['n_right']
+    out['p_left'] = out['n_left'] / out['n'].where(out['n']>0, 1)
+    out['p_right'] = out['n_right'] / out['n'].where(out['n']>0, 1)
+    # distinct centers per cell: round once, dedupe and sort globally, then collect
+    centers = (d[['type', by]].assign(center=d['center'].astype(float).round(3))
+                 .dropna(subset=['center']).drop_duplicates().sort_values('center'))
+    out['values'] = centers.groupby(['type', by])['center'].agg(tuple)
+    out = out.reset_index()
+    return out[['type',by,'n','n_left','n_right','p_left','p_right','values']]\
+              .sort_values([by,'type']).reset_index(drop=True)
 
 def analyze_mocs(df: pd.DataFrame) -> (pd.DataFrame, pd.DataFrame):
     """
@@ -233,51 +261,21 @@ def analyze_mocs(df: pd.DataFrame) -> (pd.DataFrame, pd.DataFrame):
     Columns: type, group/surr_type, n, n_left, n_right, p_left, p_right, values
     where 'values' is a tuple of the distinct center orientations actually used.
     """
-    d = _clean_mocs_df(df)
-
-    # Combined (lump poss+negs)
-    d['group'] = np.where(d['surr_type'].isin(['poss','negs']), 'with_surround', 'noss')
-    comb_counts = (d.groupby(['type','group'])['resp.keys']
-                     .value_counts().rename('count').reset_index())
-    comb_p = (comb_counts.pivot_table(index=['type','group'],
-                                      columns='resp.keys', values='count',
-                                      fill_value=0).reset_index())
-    if 'left' not in comb_p.columns: comb_p['left'] = 0
-    if 'right' not in comb_p.columns: comb_p['right'] = 0
-    comb_p['n'] = comb_p['left'] + comb_p['right']
-    comb_p['p_left'] = comb_p['left'] / comb_p['n'].where(comb_p['n']>0, 1)
-    comb_p['p_right'] = comb_p['right'] / comb_p['n'].where(comb_p['n']>0, 1)
-
-    vals_comb = (d.groupby(['type','group'])['center']
-                   .apply(_collect_values_tuple).reset_index(name='values'))
-    comb_out = comb_p.merge(vals_comb, on=['type','group'], how='left')
-    comb_out = comb_out.rename(columns={'left':'n_left','right':'n_right'})
-    comb_out = comb_out[['type','group','n','n_left','n_right','p_left','p_right','values']]\
-                     .sort_values(['group','type']).reset_index(drop=True)
+    return _analyze_mocs(_clean_mocs_df(df))
+
+def _analyze_mocs(d: pd.DataFrame) -> (pd.DataFrame, pd.DataFrame):
+    # analyze_mocs on an already cleaned frame
+    # Combined (lump poss+negs); assign so a shared cleaned frame is left untouched
+    d = d.assign(group=np.where(d['surr_type'].isin(['poss','negs']), 'with_surround', 'noss'))
+    comb_out = _left_right_by_type(d, 'group')
 
     # Separate (poss, negs, noss)
-    sep_counts = (d.groupby(['type','surr_type'])['resp.keys']
-                    .value_counts().rename('count').reset_index())
-    sep_p = (sep_counts.pivot_table(index=['type','surr_type'],
-                                    columns='resp.keys', values='count',
-                                    fill_value=0).reset_index())
-    if 'left' not in sep_p.columns: sep_p['left'] = 0
-    if 'right' not in sep_p.columns: sep_p['right'] = 0
-    sep_p['n'] = sep_p['left'] + sep_p['right']
-    sep_p['p_left'] = sep_p['left'] / sep_p['n'].where(sep_p['n']>0, 1)
-    sep_p['p_right'] = sep_p['right'] / sep_p['n'].where(sep_p['n']>0, 1)
-
-    vals_sep = (d.groupby(['type','surr_type'])['center']
-                  .apply(_collect_values_tuple).reset_index(name='values'))
-    separate = sep_p.merge(vals_sep, on=['type','surr_type'], how='left')
-    separate = separate.rename(columns={'left':'n_left','right':'n_right'})
-    separate = separate[['type','surr_type','n','n_left','n_right','p_left','p_right','values']]\
-                       .sort_values(['surr_type','type']).reset_index(drop=True)
+    separate = _left_right_by_type(d, 'surr_type')
 
     return comb_out, separate
 
 def analyze_mocs_from_csv(path: str):
-    df = pd.read_csv(path)
+    df = _read_csv_columns(path, MOCS_DTYPES)
     return analyze_mocs(df)
 
 # ------------------------------
@@ -289,22 +287,24 @@ def mocs_psychometric_tables(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
     Returns dict: {'poss': df, 'negs': df, 'noss': df} for those present.
     Each df has columns: center, n, n_left, p_left
     """
-    d = _clean_mocs_df(df)
+    return _psychometric_tables(_clean_mocs_df(df))
+
+def _psychometric_tables(d: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    # mocs_psychometric_tables on an already cleaned frame
+    # histogram-by-center per surround: np.unique codes + bincount, no pandas groupby
+    center = d['center'].to_numpy(dtype=float)
+    is_left = (d['resp.keys'] == 'left').to_numpy(dtype=bool, na_value=False)
+    has_center = ~np.isnan(center)
     out = {}
     for s in ['poss','negs','noss']:
-        g = d[d['surr_type'] == s]
-        if g.empty:
+        m = (d['surr_type'] == s).to_numpy(dtype=bool, na_value=False) & has_center
+        if not m.any():
             continue
-        tbl = (g.groupby('center')['resp.keys']
-                 .value_counts().rename('count').reset_index())
-        piv = (tbl.pivot_table(index='center', columns='resp.keys',
-                               values='count', fill_value=0).reset_index())
-        if 'left' not in piv.columns: piv['left'] = 0
-        if 'right' not in piv.columns: piv['right'] = 0
-        piv = piv.rename(columns={'left':'n_left','right':'n_right'})
-        piv['n'] = piv['n_left'] + piv['n_right']
-        piv['p_left'] = piv['n_left'] / piv['n'].where(piv['n']>0, 1)
-        out[s] = piv.sort_values('center').reset_index(drop=True)
+        centers, inv = np.unique(center[m], return_inverse=True)
+        n = np.bincount(inv, minlength=len(centers))
+        n_left = np.bincount(inv, weights=is_left[m], minlength=len(centers)).astype(np.int64)
+        out[s] = pd.DataFrame({'center': centers, 'n_left': n_left, 'n_right': n - n_left,
+                               'n': n, 'p_left': n_left / np.maximum(n, 1)})
     return out
 
 def _logistic2(x, x0, s):
@@ -316,19 +316,35 @@ def _logistic4(x, x0, s, gamma, lam):
     base = 1.0 / (1.0 + np.exp(-(x - x0) / s))
     return gamma + (1.0 - gamma - lam) * base
 
-def _negloglik_binomial(params, x, k, n, model="logistic2"):
-    # Negative log-likelihood for binomial responses
+def _negloglik_binomial(params, x, k, nk, model="logistic2"):
+    # Negative log-likelihood for binomial responses (nk = n - k, precomputed by the caller)
+    # and its analytic gradient, so L-BFGS-B needs no finite-difference evaluations
     if model == "logistic2":
         x0, s = params
-        p = _logistic2(x, x0, max(s, 1e-6))
+        gamma = lam = 0.0
     else:
         x0, s, gamma, lam = params
-        s = max(s, 1e-6)
         gamma = np.clip(gamma, 0.0, 0.2)
         lam = np.clip(lam, 0.0, 0.2)
-        p = _logistic4(x, x0, s, gamma, lam)
-    p = np.clip(p, 1e-6, 1-1e-6)
-    return -np.sum(k * np.log(p) + (n - k) * np.log(1 - p))
+    s = max(s, 1e-6)
+    z = (x - x0) / s
+    base = _logistic2(x, x0, s)
+    if model == "logistic2":
+        p = base.copy()
+    else:
+        # _logistic4 evaluated on the logistic buffer already computed above
+        p = gamma + (1.0 - gamma - lam) * base
+    inside = (p > 1e-6) & (p < 1-1e-6)
+    np.clip(p, 1e-6, 1-1e-6, out=p)
+    nll = -np.sum(xlogy(k, p) + xlogy(nk, 1.0 - p))
+
+    # d(nll)/dp, zeroed where p sits on the clip
+    dp = np.where(inside, nk / (1.0 - p) - k / p, 0.0)
+    dbase = dp * (1.0 - gamma - lam) * base * (1.0 - base) / s
+    grad = [-np.sum(dbase), -np.sum(dbase * z)]
+    if model != "logistic2":
+        grad += [np.sum(dp * (1.0 - base)), -np.sum(dp * base)]
+    return nll, np.array(grad)
 
 def fit_psychometric_logistic(table, model="logistic2"):
     """
@@ -342,9 +358,10 @@ def fit_psychometric_logistic(table, model="logistic2"):
     except Exception as e:
         raise RuntimeError("SciPy is required for fitting. Please install scipy.") from e
 
-    x = table['center'].to_numpy(dtype=float)
-    k = table['n_left'].to_numpy(dtype=float)
-    n = table['n'].to_numpy(dtype=float)
+    x = np.ascontiguousarray(table['center'].to_numpy(dtype=np.float64))
+    k = np.ascontiguousarray(table['n_left'].to_numpy(dtype=np.float64))
+    n = np.ascontiguousarray(table['n'].to_numpy(dtype=np.float64))
+    nk = n - k
 
     x0_init = np.median(x)
     s_init = max((np.max(x) - np.min(x)) / 4.0, 1e-3)
@@ -356,32 +373,26 @@ def fit_psychometric_logistic(table, model="logistic2"):
         x0 = np.array([x0_init, s_init, 0.02, 0.02], dtype=float)
         bounds = [(-np.inf, np.inf), (1e-6, np.inf), (0.0, 0.2), (0.0, 0.2)]
 
-    res = minimize(_negloglik_binomial, x0, args=(x, k, n, model), method="L-BFGS-B", bounds=bounds)
+    res = minimize(_negloglik_binomial, x0, args=(x, k, nk, model), method="L-BFGS-B",
+                   jac=True, bounds=bounds)
     out = {"model": model, "params": res.x.tolist(), "success": bool(res.success), "message": res.message}
 
+    # thresholds at p = 0.5/0.6/0.7 from one vectorized inverse
+    ps = np.clip(np.array([0.5, 0.6, 0.7]), 1e-6, 1-1e-6)
     if model == "logistic2":
         x0, s = res.x
         out.update({"x0": float(x0), "s": float(s)})
-        def inv_logit(p):
-            p = np.clip(p, 1e-6, 1-1e-6)
-            return x0 + s * np.log(p / (1 - p))
-        out["threshold_p50"] = float(inv_logit(0.5))
-        out["threshold_p60"] = float(inv_logit(0.6))
-        out["threshold_p70"] = float(inv_logit(0.7))
+        q = ps
     else:
         x0, s, gamma, lam = res.x
         out.update({"x0": float(x0), "s": float(s), "gamma": float(gamma), "lambda": float(lam)})
-        def inv_logit4(p):
-            p = np.clip(p, 1e-6, 1-1e-6)
-            q = (p - gamma) / max(1e-9, (1 - gamma - lam))
-            q = np.clip(q, 1e-6, 1-1e-6)
-            return x0 + s * np.log(q / (1 - q))
-        out["threshold_p50"] = float(inv_logit4(0.5))
-        out["threshold_p60"] = float(inv_logit4(0.6))
-        out["threshold_p70"] = float(inv_logit4(0.7))
+        q = np.clip((ps - gamma) / max(1e-9, (1 - gamma - lam)), 1e-6, 1-1e-6)
+    thr = x0 + s * np.log(q / (1 - q))
+    out["threshold_p50"], out["threshold_p60"], out["threshold_p70"] = thr.tolist()
     return out
 
-def plot_mocs_psychometric(df: pd.DataFrame, output_dir: Optional[str] = None, fit: bool = True, model: str = "logistic2"):
+def plot_mocs_psychometric(df: pd.DataFrame, output_dir: Optional[str] = None, fit: bool = True, model: str = "logistic2",
+                           show: Optional[bool] = None):
     """
     Plot empirical psychometric functions for poss, negs, noss:
       - x-axis: center orientation (deg)
@@ -389,16 +400,37 @@ def plot_mocs_psychometric(df: pd.DataFrame, output_dir: Optional[str] = None, f
     If `fit` is True, overlays a logistic curve fit (model: 'logistic2' or 'logistic4').
     If output_dir is provided, saves PNGs there and returns dict of paths;
     otherwise returns dict of matplotlib Figure objects.
+    `show` (default: only when output_dir is None) calls plt.show() on the returned
+    figures; it is skipped in interactive mode, where they are already displayed.
+    Saved figures are not shown, so show=True with output_dir raises ValueError.
     """
-    tables = mocs_psychometric_tables(df)
+    return _plot_psychometric(mocs_psychometric_tables(df), output_dir=output_dir, fit=fit,
+                              model=model, show=show)
+
+def _plot_psychometric(tables: Dict[str, pd.DataFrame], output_dir: Optional[str] = None, fit: bool = True,
+                       model: str = "logistic2", show: Optional[bool] = None):
+    # plot_mocs_psychometric on tables already built by _psychometric_tables
+    if show is None:
+        show = output_dir is None
+    elif show and output_dir is not None:
+        raise ValueError("show=True needs output_dir=None; saved figures are not shown")
     results = {}
+    if output_dir is not None:
+        import os
+        from matplotlib.figure import Figure
+        os.makedirs(output_dir, exist_ok=True)
     for surr, tab in tables.items():
-        fig = plt.figure()
+        if output_dir is not None:
+            # saved-only figures bypass pyplot (Agg canvas, no GUI backend or figure manager)
+            fig = Figure(constrained_layout=True)
+            ax = fig.add_subplot()
+        else:
+            fig, ax = plt.subplots(constrained_layout=True)
         x = tab['center'].to_numpy()
         y = tab['p_left'].to_numpy()
         order = np.argsort(x)
         x = x[order]; y = y[order]
-        plt.plot(x, y, 'o-')
+        ax.plot(x, y, 'o-')
         title_txt = f"MoCS psychometric – {surr}"
         if fit and len(np.unique(x)) >= 3:
             try:
@@ -410,31 +442,30 @@ def plot_mocs_psychometric(df: pd.DataFrame, output_dir: Optional[str] = None, f
                     yhat = _logistic4(xgrid, fitres["x0"], max(fitres["s"], 1e-6),
                                       float(fitres.get("gamma", 0.0)),
                                       float(fitres.get("lambda", 0.0)))
-                #plt.plot(xgrid, yhat, '-')
+                #ax.plot(xgrid, yhat, '-')
                 title_txt += "\\n" + f"P50={fitres['threshold_p50']:.3g}, P60={fitres['threshold_p60']:.3g}, P70={fitres['threshold_p70']:.3g}"
             except Exception as e:
                 title_txt += f" (fit failed: {e})"
-        plt.xlabel("Center orientation (deg)")
-        plt.ylabel("P(Left)")
-        plt.title(title_txt)
-        plt.ylim(0, 1)
-        plt.axhline(0.5, linestyle=':')
+        ax.set_xlabel("Center orientation (deg)")
+        ax.set_ylabel("P(Left)")
+        ax.set_title(title_txt)
+        ax.set_ylim(0, 1)
+        ax.axhline(0.5, linestyle=':')
         if output_dir is not None:
-            import os
-            os.makedirs(output_dir, exist_ok=True)
             path = os.path.join(output_dir, f"psychometric_{surr}.png")
             fig.savefig(path, bbox_inches="tight")
-            plt.close(fig)
             results[surr] = path
         else:
             results[surr] = fig
-    plt.show()
+    if show and not matplotlib.is_interactive():
+        plt.show()
     return results
 
 # ------------------------------
 # CSV plotting wrapper
 # ------------------------------
-def plot_mocs_from_csv(csv_path: str, output_dir: Optional[str] = None, fit: bool = True, model: str = "logistic2"):
+def plot_mocs_from_csv(csv_path: str, output_dir: Optional[str] = None, fit: bool = True, model: str = "logistic2",
+                       show: Optional[bool] = None):
     """
     Convenience wrapper: load a MoCS CSV and plot psychometric functions.
     Args:
@@ -442,8 +473,31 @@ def plot_mocs_from_csv(csv_path: str, output_dir: Optional[str] = None, fit: boo
         output_dir: if given, save one PNG per surround condition and return dict of paths
         fit: whether to overlay logistic fits
         model: 'logistic2' or 'logistic4'
+        show: call plt.show() on the figures (default: only when output_dir is None;
+              True together with output_dir raises ValueError)
     Returns:
         Dict[str, str|matplotlib.figure.Figure]: keys are 'poss','negs','noss' (as available)
     """
-    df = pd.read_csv(csv_path)
-    return plot_mocs_psychometric(df, output_dir=output_dir, fit=fit, model=model)
+    df = _read_csv_columns(csv_path, MOCS_DTYPES)
+    return plot_mocs_psychometric(df, output_dir=output_dir, fit=fit, model=model, show=show)
+
+# ------------------------------
+# MoCS report (one read, one clean)
+# ------------------------------
+def mocs_full_report(csv_path: str, output_dir: Optional[str] = None, fit: bool = True, model: str = "logistic2",
+                     show: Optional[bool] = None):
+    """
+    Read and clean a MoCS CSV once, then run the proportion tables, psychometric
+    tables and plots on the shared cleaned frame.
+    Returns dict with keys 'combined', 'separate', 'psychometric', 'plots'
+    (same values as analyze_mocs / mocs_psychometric_tables / plot_mocs_psychometric).
+    """
+    d = _clean_mocs_df(_read_csv_columns(csv_path, MOCS_DTYPES))
+    combined, separate = _analyze_mocs(d)
+    tables = _psychometric_tables(d)
+    return {
+        'combined': combined,
+        'separate': separate,
+        'psychometric': tables,
+        'plots': _plot_psychometric(tables, output_dir=output_dir, fit=fit, model=model, show=show),
+    }
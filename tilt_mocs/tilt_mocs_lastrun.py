@@ -24,17 +24,15 @@ from psychopy.constants import (NOT_STARTED, STARTED, PLAYING, PAUSED,
                                 STOPPED, FINISHED, PRESSED, RELEASED, FOREVER, priority)
 
 import numpy as np  # whole numpy lib is available, prepend 'np.'
-from numpy import (sin, cos, tan, log, log10, pi, average,
-                   sqrt, std, deg2rad, rad2deg, linspace, asarray)
-from numpy.random import random, randint, normal, shuffle, choice as randchoice
 import os  # handy system and path functions
 import sys  # to get file system encoding
+import time
 
-import psychopy.iohub as io
 from psychopy.hardware import keyboard
 
 # Run 'Before Experiment' code from load_stims
 import sys, os
+from pathlib import Path
 # --- Setup global variables (available in all functions) ---
 # create a device manager to handle hardware (keyboards, mice, mirophones, speakers, etc.)
 deviceManager = hardware.DeviceManager()
@@ -63,6 +61,8 @@ PILOTING = core.setPilotModeFromArgs()
 # start off with values from experiment settings
 _fullScr = True
 _winSize = [1440, 900]
+# only the wide csv is saved unless the .psydat pickle is asked for with `--pickle`
+_savePickle = '--pickle' in sys.argv
 # if in pilot mode, apply overrides according to preferences
 if PILOTING:
     # force windowed mode
@@ -118,19 +118,20 @@ def setupData(expInfo, dataDir=None):
     # data file name stem = absolute path + name; later add .psyexp, .csv, .log, etc
     if dataDir is None:
         dataDir = _thisDir
-    filename = u'data/sub-%s/ses-%s/sub-%s_ses-%s_exp-tiltmocs_%s' % (expInfo['sub'], expInfo['ses'], expInfo['sub'], expInfo['ses'], expInfo['date'])
-    # make sure filename is relative to dataDir
-    if os.path.isabs(filename):
-        dataDir = os.path.commonprefix([dataDir, filename])
-        filename = os.path.relpath(filename, dataDir)
+    # the stem is always relative to dataDir, so no commonprefix/relpath adjustment is needed
+    sub, ses = expInfo['sub'], expInfo['ses']
+    filename = os.path.join(
+        'data', f'sub-{sub}', f'ses-{ses}', f"sub-{sub}_ses-{ses}_exp-tiltmocs_{expInfo['date']}"
+    )
     
     # an ExperimentHandler isn't essential but helps with data saving
+    # (nextEntry() only appends rows in memory; the csv and pickle are written once, by saveData)
     thisExp = data.ExperimentHandler(
         name=expName, version='',
         extraInfo=expInfo, runtimeInfo=None,
         originPath='/Users/cpcr/Documents/tilt/tilt_mocs/tilt_mocs_lastrun.py',
-        savePickle=True, saveWideText=True,
-        dataFileName=dataDir + os.sep + filename, sortColumns='time'
+        savePickle=_savePickle, saveWideText=True,
+        dataFileName=os.path.join(dataDir, filename), sortColumns='time'
     )
     thisExp.setPriority('thisRow.t', priority.CRITICAL)
     thisExp.setPriority('expName', priority.LOW)
@@ -159,7 +160,8 @@ def setupLogging(filename):
         )
     else:
         logging.console.setLevel('warning')
-    # save a log file for detail verbose info
+    # save a log file for detail verbose info (psychopy.logging queues records in memory
+    # and writes them to this file in one batch on each logging.flush())
     logFile = logging.LogFile(filename+'.log')
     if PILOTING:
         logFile.setLevel(
@@ -173,6 +175,50 @@ def setupLogging(filename):
     return logFile
 
 
+def measureFrameRate(win):
+    """
+    Measure the frame rate of the screen a window is on, reusing a measurement from 
+    the last 24 h taken on the same screen, resolution and nominal refresh rate.
+    
+    A cached value is only used if it is within 5% of the nominal refresh rate, and 
+    any problem reading or writing the cache falls back to measuring.
+    
+    Parameters
+    ==========
+    win : psychopy.visual.Window
+        Window to measure the frame rate of.
+    
+    Returns
+    ==========
+    float or None
+        Frame rate in Hz, or None if it could not be measured.
+    """
+    try:
+        nominalRate = win.winHandle.screen.get_mode().rate or None
+    except Exception:
+        nominalRate = None
+    frameRateCache = Path.home() / '.cache' / 'tilt_mocs' / 'frameRate_screen{}_{}x{}_{}Hz.txt'.format(
+        win.screen, int(win.size[0]), int(win.size[1]), nominalRate
+    )
+    if nominalRate is not None:
+        try:
+            if time.time() - frameRateCache.stat().st_mtime < 24 * 60 * 60:
+                frameRate = float(frameRateCache.read_text())
+                if abs(frameRate - nominalRate) <= 0.05 * nominalRate:
+                    return frameRate
+        except (OSError, ValueError):
+            pass
+    frameRate = win.getActualFrameRate(infoMsg='Attempting to measure frame rate of screen, please wait...')
+    # without a nominal rate there's nothing to check a cached value against, so don't store it
+    if frameRate is not None and nominalRate is not None:
+        try:
+            frameRateCache.parent.mkdir(parents=True, exist_ok=True)
+            frameRateCache.write_text(str(frameRate))
+        except OSError:
+            logging.warning(f'Could not cache the measured frame rate in {frameRateCache}')
+    return frameRate
+
+
 def setupWindow(expInfo=None, win=None):
     """
     Setup the Window
@@ -211,9 +257,10 @@ def setupWindow(expInfo=None, win=None):
         win.backgroundFit = 'none'
         win.units = 'height'
     if expInfo is not None:
-        # get/measure frame rate if not already in expInfo
-        if win._monitorFrameRate is None:
-            win._monitorFrameRate = win.getActualFrameRate(infoMsg='Attempting to measure frame rate of screen, please wait...')
+        # get/measure frame rate if not already in expInfo (set expInfo['measureFrameRate'] 
+        # to False to skip measuring, e.g. while developing, and assume 60 Hz)
+        if win._monitorFrameRate is None and expInfo.get('measureFrameRate', True):
+            win._monitorFrameRate = measureFrameRate(win)
         expInfo['frameRate'] = win._monitorFrameRate
     win.hideMessage()
     # show a visual indicator if we're in piloting mode
@@ -243,16 +290,9 @@ def setupDevices(expInfo, thisExp, win):
         True if completed successfully.
     """
     # --- Setup input devices ---
+    # every keyboard reads the in-process PTB queue, so no ioHub server is launched
     ioConfig = {}
-    
-    # Setup iohub keyboard
-    ioConfig['Keyboard'] = dict(use_keymap='psychopy')
-    
-    # Setup iohub experiment
-    ioConfig['Experiment'] = dict(filename=thisExp.dataFileName)
-    
-    # Start ioHub server
-    ioServer = io.launchHubServer(window=win, **ioConfig)
+    ioSession = ioServer = eyetracker = None
     
     # store ioServer object in the device manager
     deviceManager.ioServer = ioServer
@@ -260,61 +300,70 @@ def setupDevices(expInfo, thisExp, win):
     # create a default keyboard (e.g. to check for escape)
     if deviceManager.getDevice('defaultKeyboard') is None:
         deviceManager.addDevice(
-            deviceClass='keyboard', deviceName='defaultKeyboard', backend='iohub'
+            deviceClass='keyboard', deviceName='defaultKeyboard', backend='ptb'
         )
     if deviceManager.getDevice('key_resp_2') is None:
         # initialise key_resp_2
         key_resp_2 = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp_2',
+            backend='ptb',
         )
     if deviceManager.getDevice('key_resp_6') is None:
         # initialise key_resp_6
         key_resp_6 = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp_6',
+            backend='ptb',
         )
     if deviceManager.getDevice('key_resp_3') is None:
         # initialise key_resp_3
         key_resp_3 = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp_3',
+            backend='ptb',
         )
     if deviceManager.getDevice('key_resp_5') is None:
         # initialise key_resp_5
         key_resp_5 = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp_5',
+            backend='ptb',
         )
     if deviceManager.getDevice('key_resp_4') is None:
         # initialise key_resp_4
         key_resp_4 = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp_4',
+            backend='ptb',
         )
     if deviceManager.getDevice('key_resp_8') is None:
         # initialise key_resp_8
         key_resp_8 = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp_8',
+            backend='ptb',
         )
     if deviceManager.getDevice('resp') is None:
         # initialise resp
         resp = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='resp',
+            backend='ptb',
         )
     if deviceManager.getDevice('key_resp_10') is None:
         # initialise key_resp_10
         key_resp_10 = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp_10',
+            backend='ptb',
         )
     if deviceManager.getDevice('key_resp') is None:
         # initialise key_resp
         key_resp = deviceManager.addDevice(
             deviceClass='keyboard',
             deviceName='key_resp',
+            backend='ptb',
         )
     # return True if completed successfully
     return True
@@ -350,7 +399,7 @@ def pauseExperiment(thisExp, win=None, timers=[], playbackComponents=[]):
         defaultKeyboard = deviceManager.addKeyboard(
             deviceClass='keyboard',
             deviceName='defaultKeyboard',
-            backend='ioHub',
+            backend='ptb',
         )
     # run a while loop while we wait to unpause
     while thisExp.status == PAUSED:
@@ -370,6 +419,42 @@ def pauseExperiment(thisExp, win=None, timers=[], playbackComponents=[]):
         timer.addTime(-pauseTimer.getTime())
 
 
+def startKeyboardOnFlip(kb):
+    """
+    Reset the clock and clear the event buffer of a Keyboard component that is 
+    starting, as a single callback for `win.callOnFlip` rather than one per call.
+    
+    Parameters
+    ==========
+    kb : psychopy.hardware.keyboard.Keyboard
+        Keyboard component which starts on the next flip.
+    """
+    kb.clock.reset()
+    kb.clearEvents(eventType='keyboard')
+
+
+def addRefreshTimes(thisExp, name, component):
+    """
+    Add the `.started` and `.stopped` columns for a component from the refresh 
+    times it recorded while running (both set by `win.timeOnFlip` to the actual 
+    flip), rather than queueing a timestamp callback on each flip. Edges the component never reached are left out, as they were when 
+    the callbacks were only queued on reaching them.
+    
+    Parameters
+    ==========
+    thisExp : psychopy.data.ExperimentHandler
+        Handler object for this experiment, the columns are added to its current entry.
+    name : str
+        Name of the component, used as the column prefix.
+    component : object
+        Component whose `tStartRefresh` / `tStopRefresh` to store.
+    """
+    if component.tStartRefresh is not None:
+        thisExp.addData(name + '.started', component.tStartRefresh)
+    if component.tStopRefresh is not None:
+        thisExp.addData(name + '.stopped', component.tStopRefresh)
+
+
 def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     """
     Run the experiment flow.
@@ -394,14 +479,18 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     win.winHandle.activate()
     # make sure variables created by exec are available globally
     exec = environmenttools.setExecEnvironment(globals())
-    # get device handles from dict of input devices
-    ioServer = deviceManager.ioServer
     # get/create a default keyboard (e.g. to check for escape)
     defaultKeyboard = deviceManager.getDevice('defaultKeyboard')
     if defaultKeyboard is None:
-        deviceManager.addDevice(
-            deviceClass='keyboard', deviceName='defaultKeyboard', backend='ioHub'
+        defaultKeyboard = deviceManager.addDevice(
+            deviceClass='keyboard', deviceName='defaultKeyboard', backend='ptb'
         )
+    # the PTB backend already collects key events on its own thread, so the 
+    # per-frame quit check only has to read what it has queued; bind it once and 
+    # respond to the press rather than waiting for the key to be released
+    escapeKeyList = ['escape']
+    def escapePressed():
+        return bool(defaultKeyboard.getKeys(keyList=escapeKeyList, waitRelease=False))
     eyetracker = deviceManager.getDevice('eyetracker')
     # make sure we're running in the directory for this experiment
     os.chdir(_thisDir)
@@ -425,18 +514,11 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     if int(ses) == 0: #baseline (diagnostic MoCS)
         baseline_stim_dir = f'./baseline_stims/sub-{sub}/ses-{ses}'
         baseline_stim_path = f'{baseline_stim_dir}/sub-{sub}_ses-{ses}_mocs_baseline_stims.csv'
-        if os.path.exists(baseline_stim_path) == False:
-            #find staircase data file
-            data_files = os.listdir(f'../tilt_staircase/data/sub-{sub}/ses-{ses}/')
-            for file in data_files:
-                if 'csv' in file:
-                    stair_data = f'../tilt_staircase/data/sub-{sub}/ses-{ses}/{file}'
-                    break
+        if not Path(baseline_stim_path).is_file():
+            #find staircase data file (first csv; the glob stops at the first match)
+            stair_data = next(Path(f'../tilt_staircase/data/sub-{sub}/ses-{ses}').glob('*.csv'))
             #build mocs stim from staircase
-            if os.path.exists(f'./baseline_stims/sub-{sub}') == False:
-                os.mkdir(f'./baseline_stims/sub-{sub}')
-            if os.path.exists(baseline_stim_dir) == False:
-                os.mkdir(baseline_stim_dir)
+            os.makedirs(baseline_stim_dir, exist_ok=True)
             build_trials_from_staircase(stair_data, reps_poss_negs = 40, reps_noss = 20, n_conditions = 7, out_csv = f'{baseline_stim_dir}/sub-{sub}_ses-{ses}_mocs_baseline_stims.csv')
         mocs_stims = baseline_stim_path
     elif int(ses) == 1 or int(ses) == 2:
@@ -451,7 +533,7 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=-1.0);
+        depth=-1.0, autoLog=False);
     key_resp_2 = keyboard.Keyboard(deviceName='key_resp_2')
     # Run 'Begin Experiment' code from set_contrast
     contrast = 0.2
@@ -481,24 +563,35 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=0.0);
+        depth=0.0, autoLog=False);
     key_resp_6 = keyboard.Keyboard(deviceName='key_resp_6')
     
     # --- Initialize components for Routine "practice_trial" ---
+    # untimed practice schedule as whole frames: gratings from 0.5 s for 1 s, arrow
+    # prompt from 1.5 s (same frame-index scheme as the timed flash below)
+    practiceStartFrame = int(round(0.5 / frameDur))
+    practiceFrames = int(round(1.0 / frameDur))
+    practiceArrowsStartFrame = int(round(1.5 / frameDur))
+    # one float32 sine array (same as PsychoPy's 'sin' at texRes=128), built once and
+    # passed to every grating; only this CPU-side array is shared, each stim still
+    # uploads its own GL texture from it
+    gratingTex = np.tile(
+        np.sin(np.linspace(0, 2 * np.pi, 128, dtype=np.float32) - np.float32(np.pi / 2)), (128, 1)
+    )
     surround_practice = visual.GratingStim(
         win=win, name='surround_practice',units='cm', 
-        tex='sin', mask='circle', anchor='center',
+        tex=gratingTex, mask='circle', anchor='center',
         ori=1.0, pos=(0,0), draggable=False, size=1.0, sf=1.0, phase=1.0,
         color=[1,1,1], colorSpace='rgb',
         opacity=None, contrast=contrast, blendmode='avg',
-        texRes=128.0, interpolate=True, depth=-1.0)
+        interpolate=True, depth=-1.0, autoLog=False)
     center_practice = visual.GratingStim(
         win=win, name='center_practice',units='cm', 
-        tex='sin', mask='circle', anchor='center',
+        tex=gratingTex, mask='circle', anchor='center',
         ori=1.0, pos=(0,0), draggable=False, size=1.0, sf=1.0, phase=1.0,
         color=[1,1,1], colorSpace='rgb',
         opacity=None, contrast=1.0, blendmode='avg',
-        texRes=128.0, interpolate=True, depth=-2.0)
+        interpolate=True, depth=-2.0, autoLog=False)
     key_resp_3 = keyboard.Keyboard(deviceName='key_resp_3')
     text_11 = visual.TextStim(win=win, name='text_11',
         text='<--                    -->\nleft                   right',
@@ -506,18 +599,26 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         pos=(0,0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=-4.0);
+        depth=-4.0, autoLog=False);
     
     # --- Initialize components for Routine "practice_feedback" ---
     # Run 'Begin Experiment' code from code_2
     msg = 'msg didnt load'
-    text_7 = visual.TextStim(win=win, name='text_7',
-        text='',
-        font='Arial',
-        pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
-        color='white', colorSpace='rgb', opacity=None, 
-        languageStyle='LTR',
-        depth=-1.0);
+    # feedback is only ever 'Correct' or 'Incorrect', so lay out one stim per message
+    # here and point text_7 at the right one each trial instead of re-setting its text
+    text_7Stims = {
+        feedbackText: visual.TextStim(win=win, name='text_7',
+            text=feedbackText,
+            font='Arial',
+            pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
+            color='white', colorSpace='rgb', opacity=None, 
+            languageStyle='LTR',
+            depth=-1.0, autoLog=False)
+        for feedbackText in ('Correct', 'Incorrect')
+    }
+    text_7 = text_7Stims['Incorrect']
+    # feedback is shown for 1.5 s, counted in whole frames like the practice schedules
+    feedbackFrames = int(round(1.5 / frameDur))
     
     # --- Initialize components for Routine "instr3" ---
     text_8 = visual.TextStim(win=win, name='text_8',
@@ -526,24 +627,29 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=0.0);
+        depth=0.0, autoLog=False);
     key_resp_5 = keyboard.Keyboard(deviceName='key_resp_5')
     
     # --- Initialize components for Routine "practice_trial_timed" ---
+    # the 80 ms flash (0.5 s into the routine) and the arrow prompt (0.58 s) as whole
+    # frames, so practice_trial_timed and trial compare frame indices, not flip times
+    flashStartFrame = int(round(0.5 / frameDur))
+    flashFrames = int(round(0.08 / frameDur))
+    arrowsStartFrame = int(round(0.58 / frameDur))
     surround_practice_2 = visual.GratingStim(
         win=win, name='surround_practice_2',units='cm', 
-        tex='sin', mask='circle', anchor='center',
+        tex=gratingTex, mask='circle', anchor='center',
         ori=1.0, pos=(0,0), draggable=False, size=1.0, sf=1.0, phase=0.0,
         color=[1,1,1], colorSpace='rgb',
         opacity=1.0, contrast=contrast, blendmode='avg',
-        texRes=128.0, interpolate=True, depth=0.0)
+        interpolate=True, depth=0.0, autoLog=False)
     center_practice_2 = visual.GratingStim(
         win=win, name='center_practice_2',units='cm', 
-        tex='sin', mask='circle', anchor='center',
+        tex=gratingTex, mask='circle', anchor='center',
         ori=1.0, pos=(0,0), draggable=False, size=center_size, sf=1.0, phase=0.0,
         color=[1,1,1], colorSpace='rgb',
         opacity=None, contrast=contrast, blendmode='avg',
-        texRes=128.0, interpolate=True, depth=-1.0)
+        interpolate=True, depth=-1.0, autoLog=False)
     key_resp_4 = keyboard.Keyboard(deviceName='key_resp_4')
     text_12 = visual.TextStim(win=win, name='text_12',
         text='<--                    -->\nleft                   right',
@@ -551,18 +657,11 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         pos=(0,0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=-3.0);
+        depth=-3.0, autoLog=False);
     
     # --- Initialize components for Routine "practice_feedback" ---
-    # Run 'Begin Experiment' code from code_2
-    msg = 'msg didnt load'
-    text_7 = visual.TextStim(win=win, name='text_7',
-        text='',
-        font='Arial',
-        pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
-        color='white', colorSpace='rgb', opacity=None, 
-        languageStyle='LTR',
-        depth=-1.0);
+    # practice_feedback runs again after practice_trial_timed; msg and the text_7 stims
+    # were created above and are reused rather than built a second time
     
     # --- Initialize components for Routine "start_instr" ---
     text_13 = visual.TextStim(win=win, name='text_13',
@@ -571,37 +670,44 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=0.0);
+        depth=0.0, autoLog=False);
     key_resp_8 = keyboard.Keyboard(deviceName='key_resp_8')
     
     # --- Initialize components for Routine "trial" ---
     # Run 'Begin Experiment' code from set_phase
-    import random
+    # one numpy Generator for the grating phases, seeded from the subject/session labels
+    # (which need not be numeric) so a session's phase sequence can be replayed
+    phaseRng = np.random.default_rng(int.from_bytes(f'sub-{sub}_ses-{ses}'.encode(), 'little'))
     surround_grating = visual.GratingStim(
         win=win, name='surround_grating',units='cm', 
-        tex='sin', mask='circle', anchor='center',
+        tex=gratingTex, mask='circle', anchor='center',
         ori=1.0, pos=(0,0), draggable=False, size=1.0, sf=1.0, phase=1.0,
         color=[1,1,1], colorSpace='rgb',
         opacity=1.0, contrast=contrast, blendmode='avg',
-        texRes=128.0, interpolate=True, depth=-1.0)
+        interpolate=True, depth=-1.0, autoLog=False)
     center_grating = visual.GratingStim(
         win=win, name='center_grating',units='cm', 
-        tex='sin', mask='circle', anchor='center',
+        tex=gratingTex, mask='circle', anchor='center',
         ori=1.0, pos=(0,0), draggable=False, size=1.0, sf=1.0, phase=1.0,
         color=[1,1,1], colorSpace='rgb',
         opacity=None, contrast=contrast, blendmode='avg',
-        texRes=128.0, interpolate=True, depth=-2.0)
+        interpolate=True, depth=-2.0, autoLog=False)
     resp = keyboard.Keyboard(deviceName='resp')
+    respKeyList = frozenset({'left', 'right'})
     
     # --- Initialize components for Routine "break_2" ---
+    # trial numbers after which the break is shown
+    breakTrialNs = frozenset({100, 300, 500})
     text_2 = visual.TextStim(win=win, name='text_2',
         text='Take a short break. Thanks for pushing through! \n\nPress Spacebar to continue',
         font='Arial',
         pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=0.0);
+        depth=0.0, autoLog=False);
     key_resp_10 = keyboard.Keyboard(deviceName='key_resp_10')
+    # accepted keys, built once for the per-frame check
+    key_resp_10KeyList = frozenset({'space'})
     
     # --- Initialize components for Routine "end" ---
     text_14 = visual.TextStim(win=win, name='text_14',
@@ -610,8 +716,9 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         pos=(0, 0), draggable=False, height=0.05, wrapWidth=None, ori=0.0, 
         color='white', colorSpace='rgb', opacity=None, 
         languageStyle='LTR',
-        depth=0.0);
+        depth=0.0, autoLog=False);
     key_resp = keyboard.Keyboard(deviceName='key_resp')
+    key_respKeyList = frozenset({'y', 'n', 'left', 'right', 'space'})
     
     # create some handy timers
     
@@ -630,11 +737,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         else:
             # get timestamps in a custom format
             globalClock = core.Clock(format=globalClock)
-    if ioServer is not None:
-        ioServer.syncClock(globalClock)
     logging.setDefaultClock(globalClock)
     # routine timer to track time remaining of each (possibly non-slip) routine
     routineTimer = core.Clock()
+    # bound methods called at the top of every frame, looked up once here
+    getRoutineTime = routineTimer.getTime
+    getFutureFlipTime = win.getFutureFlipTime
+    flip = win.flip
+    # raise the process priority for the frame loops (dropped again in endExperiment);
+    # rush() warns and carries on if the OS refuses
+    core.rush(True)
     win.flip()  # flip window to reset last flip timer
     # store the exact time the global clock started
     expInfo['expStart'] = data.getDateStr(
@@ -653,7 +765,6 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     # create starting attributes for key_resp_2
     key_resp_2.keys = []
     key_resp_2.rt = []
-    _key_resp_2_allKeys = []
     # store start times for instr
     instr.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
     instr.tStart = globalClock.getTime(format='float')
@@ -662,6 +773,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     instr.maxDuration = None
     # keep track of which components have finished
     instrComponents = instr.components
+    # components with a status, filtered once here rather than on every frame
+    instrStatusComponents = [
+        thisComponent for thisComponent in instr.components if hasattr(thisComponent, 'status')
+    ]
+    # stims to switch off when the routine ends, filtered alongside the above
+    instrDrawComponents = [
+        thisComponent for thisComponent in instr.components if hasattr(thisComponent, 'setAutoDraw')
+    ]
+    # counted down as each one finishes, so the end-of-frame check is one compare
+    instrUnfinished = len(instrStatusComponents)
     for thisComponent in instr.components:
         thisComponent.tStart = None
         thisComponent.tStop = None
@@ -678,62 +799,52 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     instr.forceEnded = routineForceEnded = not continueRoutine
     while continueRoutine:
         # get current time
-        t = routineTimer.getTime()
-        tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-        tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+        t = getRoutineTime()
+        tThisFlipGlobal = getFutureFlipTime(clock=None)
         frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
         # update/draw components on each frame
         
         # *text_5* updates
         
         # if text_5 is starting this frame...
-        if text_5.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if text_5.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             text_5.frameNStart = frameN  # exact frame index
             text_5.tStart = t  # local t and not account for scr refresh
             text_5.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(text_5, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'text_5.started')
             # update status
             text_5.status = STARTED
             text_5.setAutoDraw(True)
         
-        # if text_5 is active this frame...
-        if text_5.status == STARTED:
-            # update params
-            pass
-        
         # *key_resp_2* updates
         waitOnFlip = False
         
         # if key_resp_2 is starting this frame...
-        if key_resp_2.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if key_resp_2.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             key_resp_2.frameNStart = frameN  # exact frame index
             key_resp_2.tStart = t  # local t and not account for scr refresh
             key_resp_2.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(key_resp_2, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'key_resp_2.started')
             # update status
             key_resp_2.status = STARTED
             # keyboard checking is just starting
             waitOnFlip = True
-            win.callOnFlip(key_resp_2.clock.reset)  # t=0 on next screen flip
-            win.callOnFlip(key_resp_2.clearEvents, eventType='keyboard')  # clear events on next screen flip
+            win.callOnFlip(startKeyboardOnFlip, key_resp_2)  # t=0 and clear events on next screen flip
         if key_resp_2.status == STARTED and not waitOnFlip:
             theseKeys = key_resp_2.getKeys(keyList=['space'], ignoreKeys=["escape"], waitRelease=False)
-            _key_resp_2_allKeys.extend(theseKeys)
-            if len(_key_resp_2_allKeys):
-                key_resp_2.keys = _key_resp_2_allKeys[-1].name  # just the last key pressed
-                key_resp_2.rt = _key_resp_2_allKeys[-1].rt
-                key_resp_2.duration = _key_resp_2_allKeys[-1].duration
+            # the first response ends the routine, so only this call's last key is kept
+            if theseKeys:
+                lastKey = theseKeys[-1]  # just the last key pressed
+                key_resp_2.keys = lastKey.name
+                key_resp_2.rt = lastKey.rt
+                key_resp_2.duration = lastKey.duration
                 # a response ends the routine
                 continueRoutine = False
         
         # check for quit (typically the Esc key)
-        if defaultKeyboard.getKeys(keyList=["escape"]):
+        if escapePressed():
             thisExp.status = FINISHED
         if thisExp.status == FINISHED or endExpNow:
             endExperiment(thisExp, win=win)
@@ -753,24 +864,26 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         if not continueRoutine:  # a component has requested a forced-end of Routine
             instr.forceEnded = routineForceEnded = True
             break
-        continueRoutine = False  # will revert to True if at least one component still running
-        for thisComponent in instr.components:
-            if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                continueRoutine = True
-                break  # at least one component has not yet finished
+        # True if at least one component still running
+        continueRoutine = instrUnfinished > 0
         
         # refresh the screen
         if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-            win.flip()
+            if text_5.status == STARTED and frameN > text_5.frameNStart:
+                # the instructions have been flipped on and nothing changes, so sleep for a 
+                # couple of frames between flips (keys stay buffered for the checks above)
+                core.wait(2 * frameDur, hogCPUperiod=0)
+            flip()
     
     # --- Ending Routine "instr" ---
-    for thisComponent in instr.components:
-        if hasattr(thisComponent, "setAutoDraw"):
-            thisComponent.setAutoDraw(False)
+    for thisComponent in instrDrawComponents:
+        thisComponent.setAutoDraw(False)
     # store stop times for instr
     instr.tStop = globalClock.getTime(format='float')
     instr.tStopRefresh = tThisFlipGlobal
     thisExp.addData('instr.stopped', instr.tStop)
+    addRefreshTimes(thisExp, 'text_5', text_5)
+    addRefreshTimes(thisExp, 'key_resp_2', key_resp_2)
     # check responses
     if key_resp_2.keys in ['', [], None]:  # No response was made
         key_resp_2.keys = None
@@ -794,7 +907,6 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     # create starting attributes for key_resp_6
     key_resp_6.keys = []
     key_resp_6.rt = []
-    _key_resp_6_allKeys = []
     # store start times for instr2
     instr2.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
     instr2.tStart = globalClock.getTime(format='float')
@@ -803,6 +915,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     instr2.maxDuration = None
     # keep track of which components have finished
     instr2Components = instr2.components
+    # components with a status, filtered once here rather than on every frame
+    instr2StatusComponents = [
+        thisComponent for thisComponent in instr2.components if hasattr(thisComponent, 'status')
+    ]
+    # stims to switch off when the routine ends, filtered alongside the above
+    instr2DrawComponents = [
+        thisComponent for thisComponent in instr2.components if hasattr(thisComponent, 'setAutoDraw')
+    ]
+    # counted down as each one finishes, so the end-of-frame check is one compare
+    instr2Unfinished = len(instr2StatusComponents)
     for thisComponent in instr2.components:
         thisComponent.tStart = None
         thisComponent.tStop = None
@@ -819,62 +941,52 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     instr2.forceEnded = routineForceEnded = not continueRoutine
     while continueRoutine:
         # get current time
-        t = routineTimer.getTime()
-        tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-        tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+        t = getRoutineTime()
+        tThisFlipGlobal = getFutureFlipTime(clock=None)
         frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
         # update/draw components on each frame
         
         # *text_6* updates
         
         # if text_6 is starting this frame...
-        if text_6.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if text_6.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             text_6.frameNStart = frameN  # exact frame index
             text_6.tStart = t  # local t and not account for scr refresh
             text_6.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(text_6, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'text_6.started')
             # update status
             text_6.status = STARTED
             text_6.setAutoDraw(True)
         
-        # if text_6 is active this frame...
-        if text_6.status == STARTED:
-            # update params
-            pass
-        
         # *key_resp_6* updates
         waitOnFlip = False
         
         # if key_resp_6 is starting this frame...
-        if key_resp_6.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if key_resp_6.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             key_resp_6.frameNStart = frameN  # exact frame index
             key_resp_6.tStart = t  # local t and not account for scr refresh
             key_resp_6.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(key_resp_6, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'key_resp_6.started')
             # update status
             key_resp_6.status = STARTED
             # keyboard checking is just starting
             waitOnFlip = True
-            win.callOnFlip(key_resp_6.clock.reset)  # t=0 on next screen flip
-            win.callOnFlip(key_resp_6.clearEvents, eventType='keyboard')  # clear events on next screen flip
+            win.callOnFlip(startKeyboardOnFlip, key_resp_6)  # t=0 and clear events on next screen flip
         if key_resp_6.status == STARTED and not waitOnFlip:
             theseKeys = key_resp_6.getKeys(keyList=['space'], ignoreKeys=["escape"], waitRelease=False)
-            _key_resp_6_allKeys.extend(theseKeys)
-            if len(_key_resp_6_allKeys):
-                key_resp_6.keys = _key_resp_6_allKeys[-1].name  # just the last key pressed
-                key_resp_6.rt = _key_resp_6_allKeys[-1].rt
-                key_resp_6.duration = _key_resp_6_allKeys[-1].duration
+            # the first response ends the routine, so only this call's last key is kept
+            if theseKeys:
+                lastKey = theseKeys[-1]  # just the last key pressed
+                key_resp_6.keys = lastKey.name
+                key_resp_6.rt = lastKey.rt
+                key_resp_6.duration = lastKey.duration
                 # a response ends the routine
                 continueRoutine = False
         
         # check for quit (typically the Esc key)
-        if defaultKeyboard.getKeys(keyList=["escape"]):
+        if escapePressed():
             thisExp.status = FINISHED
         if thisExp.status == FINISHED or endExpNow:
             endExperiment(thisExp, win=win)
@@ -894,24 +1006,26 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         if not continueRoutine:  # a component has requested a forced-end of Routine
             instr2.forceEnded = routineForceEnded = True
             break
-        continueRoutine = False  # will revert to True if at least one component still running
-        for thisComponent in instr2.components:
-            if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                continueRoutine = True
-                break  # at least one component has not yet finished
+        # True if at least one component still running
+        continueRoutine = instr2Unfinished > 0
         
         # refresh the screen
         if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-            win.flip()
+            if text_6.status == STARTED and frameN > text_6.frameNStart:
+                # the instructions have been flipped on and nothing changes, so sleep for a 
+                # couple of frames between flips (keys stay buffered for the checks above)
+                core.wait(2 * frameDur, hogCPUperiod=0)
+            flip()
     
     # --- Ending Routine "instr2" ---
-    for thisComponent in instr2.components:
-        if hasattr(thisComponent, "setAutoDraw"):
-            thisComponent.setAutoDraw(False)
+    for thisComponent in instr2DrawComponents:
+        thisComponent.setAutoDraw(False)
     # store stop times for instr2
     instr2.tStop = globalClock.getTime(format='float')
     instr2.tStopRefresh = tThisFlipGlobal
     thisExp.addData('instr2.stopped', instr2.tStop)
+    addRefreshTimes(thisExp, 'text_6', text_6)
+    addRefreshTimes(thisExp, 'key_resp_6', key_resp_6)
     # check responses
     if key_resp_6.keys in ['', [], None]:  # No response was made
         key_resp_6.keys = None
@@ -935,14 +1049,18 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     )
     thisExp.addLoop(practice_no_time)  # add the loop to the experiment
     thisPractice_no_time = practice_no_time.trialList[0]  # so we can initialise stimuli with some values
-    # abbreviate parameter names if possible (e.g. rgb = thisPractice_no_time.rgb)
+    # abbreviate parameter names if possible (e.g. rgb = thisPractice_no_time.rgb);
+    # only the columns the routines read are unpacked, into locals of run()
     if thisPractice_no_time != None:
-        for paramName in thisPractice_no_time:
-            globals()[paramName] = thisPractice_no_time[paramName]
+        center = thisPractice_no_time['center']
+        surround = thisPractice_no_time['surround']
+        correct = thisPractice_no_time['correct']
     if thisSession is not None:
         # if running in a Session with a Liaison client, send data up to now
         thisSession.sendExperimentData()
     
+    # draw the (center, surround) phases for every trial of the loop in one call
+    practicePhases = phaseRng.random((practice_no_time.nTotal, 2))
     for thisPractice_no_time in practice_no_time:
         currentLoop = practice_no_time
         thisExp.timestampOnFlip(win, 'thisRow.t', format=globalClock.format)
@@ -951,8 +1069,9 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             thisSession.sendExperimentData()
         # abbreviate parameter names if possible (e.g. rgb = thisPractice_no_time.rgb)
         if thisPractice_no_time != None:
-            for paramName in thisPractice_no_time:
-                globals()[paramName] = thisPractice_no_time[paramName]
+            center = thisPractice_no_time['center']
+            surround = thisPractice_no_time['surround']
+            correct = thisPractice_no_time['correct']
         
         # --- Prepare to start Routine "practice_trial" ---
         # create an object to store info about Routine practice_trial
@@ -964,22 +1083,24 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         continueRoutine = True
         # update component parameters for each repeat
         # Run 'Begin Routine' code from code_3
-        center_phase = random.random()
-        surround_phase = random.random()
-        
-        surround_practice.setSize(surround_size)
-        surround_practice.setOri(surround)
-        surround_practice.setSF(surround_sf)
-        surround_practice.setPhase(surround_phase)
-        center_practice.setContrast(contrast)
-        center_practice.setSize(center_size)
-        center_practice.setOri(center)
-        center_practice.setSF(center_sf)
-        center_practice.setPhase(center_phase)
+        center_phase, surround_phase = practicePhases[practice_no_time.thisN]
+        
+        # assign grating parameters directly, skipping the setters' per-call
+        # setAttribute and logging overhead
+        surround_practice.size = surround_size
+        surround_practice.ori = surround
+        surround_practice.sf = surround_sf
+        surround_practice.phase = surround_phase
+        center_practice.contrast = contrast
+        center_practice.size = center_size
+        center_practice.ori = center
+        center_practice.sf = center_sf
+        center_practice.phase = center_phase
         # create starting attributes for key_resp_3
         key_resp_3.keys = []
         key_resp_3.rt = []
-        _key_resp_3_allKeys = []
+        # key names are strings, so the answer is compared as one
+        correctKey = str(correct)
         # store start times for practice_trial
         practice_trial.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
         practice_trial.tStart = globalClock.getTime(format='float')
@@ -988,6 +1109,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_trial.maxDuration = None
         # keep track of which components have finished
         practice_trialComponents = practice_trial.components
+        # components with a status, filtered once here rather than on every frame
+        practice_trialStatusComponents = [
+            thisComponent for thisComponent in practice_trial.components if hasattr(thisComponent, 'status')
+        ]
+        # stims to switch off when the routine ends, filtered alongside the above
+        practice_trialDrawComponents = [
+            thisComponent for thisComponent in practice_trial.components if hasattr(thisComponent, 'setAutoDraw')
+        ]
+        # counted down as each one finishes, so the end-of-frame check is one compare
+        practice_trialUnfinished = len(practice_trialStatusComponents)
         for thisComponent in practice_trial.components:
             thisComponent.tStart = None
             thisComponent.tStop = None
@@ -1007,135 +1138,110 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_trial.forceEnded = routineForceEnded = not continueRoutine
         while continueRoutine:
             # get current time
-            t = routineTimer.getTime()
-            tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-            tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+            t = getRoutineTime()
+            # every onset here is scheduled in frames, so only the global flip time
+            # (for the refresh timestamps) has to be predicted
+            tThisFlipGlobal = getFutureFlipTime(clock=None)
             frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
             # update/draw components on each frame
             
             # *surround_practice* updates
             
             # if surround_practice is starting this frame...
-            if surround_practice.status == NOT_STARTED and tThisFlip >= 0.5-frameTolerance:
+            if surround_practice.status == NOT_STARTED and frameN >= practiceStartFrame:
                 # keep track of start time/frame for later
                 surround_practice.frameNStart = frameN  # exact frame index
                 surround_practice.tStart = t  # local t and not account for scr refresh
                 surround_practice.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(surround_practice, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'surround_practice.started')
                 # update status
                 surround_practice.status = STARTED
                 surround_practice.setAutoDraw(True)
             
-            # if surround_practice is active this frame...
-            if surround_practice.status == STARTED:
-                # update params
-                pass
-            
             # if surround_practice is stopping this frame...
             if surround_practice.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > surround_practice.tStartRefresh + 1-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= surround_practice.frameNStart + practiceFrames:
                     # keep track of stop time/frame for later
                     surround_practice.tStop = t  # not accounting for scr refresh
                     surround_practice.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(surround_practice, 'tStopRefresh')  # time at next scr refresh
                     surround_practice.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'surround_practice.stopped')
                     # update status
                     surround_practice.status = FINISHED
+                    practice_trialUnfinished -= 1
                     surround_practice.setAutoDraw(False)
             
             # *center_practice* updates
             
             # if center_practice is starting this frame...
-            if center_practice.status == NOT_STARTED and tThisFlip >= 0.5-frameTolerance:
+            if center_practice.status == NOT_STARTED and frameN >= practiceStartFrame:
                 # keep track of start time/frame for later
                 center_practice.frameNStart = frameN  # exact frame index
                 center_practice.tStart = t  # local t and not account for scr refresh
                 center_practice.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(center_practice, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'center_practice.started')
                 # update status
                 center_practice.status = STARTED
                 center_practice.setAutoDraw(True)
             
-            # if center_practice is active this frame...
-            if center_practice.status == STARTED:
-                # update params
-                pass
-            
             # if center_practice is stopping this frame...
             if center_practice.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > center_practice.tStartRefresh + 1-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= center_practice.frameNStart + practiceFrames:
                     # keep track of stop time/frame for later
                     center_practice.tStop = t  # not accounting for scr refresh
                     center_practice.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(center_practice, 'tStopRefresh')  # time at next scr refresh
                     center_practice.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'center_practice.stopped')
                     # update status
                     center_practice.status = FINISHED
+                    practice_trialUnfinished -= 1
                     center_practice.setAutoDraw(False)
             
             # *key_resp_3* updates
             waitOnFlip = False
             
             # if key_resp_3 is starting this frame...
-            if key_resp_3.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+            if key_resp_3.status == NOT_STARTED and frameN >= 0:
                 # keep track of start time/frame for later
                 key_resp_3.frameNStart = frameN  # exact frame index
                 key_resp_3.tStart = t  # local t and not account for scr refresh
                 key_resp_3.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(key_resp_3, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'key_resp_3.started')
                 # update status
                 key_resp_3.status = STARTED
                 # keyboard checking is just starting
                 waitOnFlip = True
-                win.callOnFlip(key_resp_3.clock.reset)  # t=0 on next screen flip
-                win.callOnFlip(key_resp_3.clearEvents, eventType='keyboard')  # clear events on next screen flip
+                win.callOnFlip(startKeyboardOnFlip, key_resp_3)  # t=0 and clear events on next screen flip
             if key_resp_3.status == STARTED and not waitOnFlip:
                 theseKeys = key_resp_3.getKeys(keyList=['left','right'], ignoreKeys=["escape"], waitRelease=False)
-                _key_resp_3_allKeys.extend(theseKeys)
-                if len(_key_resp_3_allKeys):
-                    key_resp_3.keys = _key_resp_3_allKeys[-1].name  # just the last key pressed
-                    key_resp_3.rt = _key_resp_3_allKeys[-1].rt
-                    key_resp_3.duration = _key_resp_3_allKeys[-1].duration
+                # the first response ends the routine, so only this call's last key is kept
+                if theseKeys:
+                    lastKey = theseKeys[-1]  # just the last key pressed
+                    key_resp_3.keys = lastKey.name
+                    key_resp_3.rt = lastKey.rt
+                    key_resp_3.duration = lastKey.duration
                     # was this correct?
-                    if (key_resp_3.keys == str(correct)) or (key_resp_3.keys == correct):
-                        key_resp_3.corr = 1
-                    else:
-                        key_resp_3.corr = 0
+                    key_resp_3.corr = int(key_resp_3.keys == correctKey)
                     # a response ends the routine
                     continueRoutine = False
             
             # *text_11* updates
             
             # if text_11 is starting this frame...
-            if text_11.status == NOT_STARTED and tThisFlip >= 1.5-frameTolerance:
+            if text_11.status == NOT_STARTED and frameN >= practiceArrowsStartFrame:
                 # keep track of start time/frame for later
                 text_11.frameNStart = frameN  # exact frame index
                 text_11.tStart = t  # local t and not account for scr refresh
                 text_11.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(text_11, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'text_11.started')
                 # update status
                 text_11.status = STARTED
                 text_11.setAutoDraw(True)
             
-            # if text_11 is active this frame...
-            if text_11.status == STARTED:
-                # update params
-                pass
-            
             # check for quit (typically the Esc key)
-            if defaultKeyboard.getKeys(keyList=["escape"]):
+            if escapePressed():
                 thisExp.status = FINISHED
             if thisExp.status == FINISHED or endExpNow:
                 endExperiment(thisExp, win=win)
@@ -1155,29 +1261,29 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             if not continueRoutine:  # a component has requested a forced-end of Routine
                 practice_trial.forceEnded = routineForceEnded = True
                 break
-            continueRoutine = False  # will revert to True if at least one component still running
-            for thisComponent in practice_trial.components:
-                if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                    continueRoutine = True
-                    break  # at least one component has not yet finished
+            # True if at least one component still running
+            continueRoutine = practice_trialUnfinished > 0
             
             # refresh the screen
             if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-                win.flip()
+                flip()
         
         # --- Ending Routine "practice_trial" ---
-        for thisComponent in practice_trial.components:
-            if hasattr(thisComponent, "setAutoDraw"):
-                thisComponent.setAutoDraw(False)
+        for thisComponent in practice_trialDrawComponents:
+            thisComponent.setAutoDraw(False)
         # store stop times for practice_trial
         practice_trial.tStop = globalClock.getTime(format='float')
         practice_trial.tStopRefresh = tThisFlipGlobal
         thisExp.addData('practice_trial.stopped', practice_trial.tStop)
+        addRefreshTimes(thisExp, 'surround_practice', surround_practice)
+        addRefreshTimes(thisExp, 'center_practice', center_practice)
+        addRefreshTimes(thisExp, 'key_resp_3', key_resp_3)
+        addRefreshTimes(thisExp, 'text_11', text_11)
         # check responses
         if key_resp_3.keys in ['', [], None]:  # No response was made
             key_resp_3.keys = None
             # was no response the correct answer?!
-            if str(correct).lower() == 'none':
+            if correctKey.lower() == 'none':
                key_resp_3.corr = 1;  # correct non-response
             else:
                key_resp_3.corr = 0;  # failed to respond (incorrectly)
@@ -1191,6 +1297,12 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         routineTimer.reset()
         
         # --- Prepare to start Routine "practice_feedback" ---
+        # Run 'Begin Routine' code from code_2
+        if key_resp_3.corr == True:
+            msg = 'Correct'
+        else:
+            msg = 'Incorrect'
+        text_7 = text_7Stims[msg]
         # create an object to store info about Routine practice_feedback
         practice_feedback = data.Routine(
             name='practice_feedback',
@@ -1199,12 +1311,6 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_feedback.status = NOT_STARTED
         continueRoutine = True
         # update component parameters for each repeat
-        # Run 'Begin Routine' code from code_2
-        if key_resp_3.corr == True:
-            msg = 'Correct'
-        else:
-            msg = 'Incorrect'
-        text_7.setText(msg)
         # store start times for practice_feedback
         practice_feedback.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
         practice_feedback.tStart = globalClock.getTime(format='float')
@@ -1213,6 +1319,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_feedback.maxDuration = None
         # keep track of which components have finished
         practice_feedbackComponents = practice_feedback.components
+        # components with a status, filtered once here rather than on every frame
+        practice_feedbackStatusComponents = [
+            thisComponent for thisComponent in practice_feedback.components if hasattr(thisComponent, 'status')
+        ]
+        # stims to switch off when the routine ends, filtered alongside the above
+        practice_feedbackDrawComponents = [
+            thisComponent for thisComponent in practice_feedback.components if hasattr(thisComponent, 'setAutoDraw')
+        ]
+        # counted down as each one finishes, so the end-of-frame check is one compare
+        practice_feedbackUnfinished = len(practice_feedbackStatusComponents)
         for thisComponent in practice_feedback.components:
             thisComponent.tStart = None
             thisComponent.tStop = None
@@ -1230,50 +1346,42 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         if isinstance(practice_no_time, data.TrialHandler2) and thisPractice_no_time.thisN != practice_no_time.thisTrial.thisN:
             continueRoutine = False
         practice_feedback.forceEnded = routineForceEnded = not continueRoutine
-        while continueRoutine and routineTimer.getTime() < 1.5:
+        while continueRoutine:
             # get current time
-            t = routineTimer.getTime()
-            tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-            tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+            t = getRoutineTime()
+            tThisFlipGlobal = getFutureFlipTime(clock=None)
             frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
             # update/draw components on each frame
             
             # *text_7* updates
             
             # if text_7 is starting this frame...
-            if text_7.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+            if text_7.status == NOT_STARTED and frameN >= 0:
                 # keep track of start time/frame for later
                 text_7.frameNStart = frameN  # exact frame index
                 text_7.tStart = t  # local t and not account for scr refresh
                 text_7.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(text_7, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'text_7.started')
                 # update status
                 text_7.status = STARTED
                 text_7.setAutoDraw(True)
             
-            # if text_7 is active this frame...
-            if text_7.status == STARTED:
-                # update params
-                pass
-            
             # if text_7 is stopping this frame...
             if text_7.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > text_7.tStartRefresh + 1.5-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= text_7.frameNStart + feedbackFrames:
                     # keep track of stop time/frame for later
                     text_7.tStop = t  # not accounting for scr refresh
                     text_7.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(text_7, 'tStopRefresh')  # time at next scr refresh
                     text_7.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'text_7.stopped')
                     # update status
                     text_7.status = FINISHED
+                    practice_feedbackUnfinished -= 1
                     text_7.setAutoDraw(False)
             
             # check for quit (typically the Esc key)
-            if defaultKeyboard.getKeys(keyList=["escape"]):
+            if escapePressed():
                 thisExp.status = FINISHED
             if thisExp.status == FINISHED or endExpNow:
                 endExperiment(thisExp, win=win)
@@ -1293,31 +1401,28 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             if not continueRoutine:  # a component has requested a forced-end of Routine
                 practice_feedback.forceEnded = routineForceEnded = True
                 break
-            continueRoutine = False  # will revert to True if at least one component still running
-            for thisComponent in practice_feedback.components:
-                if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                    continueRoutine = True
-                    break  # at least one component has not yet finished
+            # True if at least one component still running
+            continueRoutine = practice_feedbackUnfinished > 0
             
             # refresh the screen
             if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-                win.flip()
+                flip()
         
         # --- Ending Routine "practice_feedback" ---
-        for thisComponent in practice_feedback.components:
-            if hasattr(thisComponent, "setAutoDraw"):
-                thisComponent.setAutoDraw(False)
+        for thisComponent in practice_feedbackDrawComponents:
+            thisComponent.setAutoDraw(False)
         # store stop times for practice_feedback
         practice_feedback.tStop = globalClock.getTime(format='float')
         practice_feedback.tStopRefresh = tThisFlipGlobal
         thisExp.addData('practice_feedback.stopped', practice_feedback.tStop)
+        addRefreshTimes(thisExp, 'text_7', text_7)
         # using non-slip timing so subtract the expected duration of this Routine (unless ended on request)
         if practice_feedback.maxDurationReached:
             routineTimer.addTime(-practice_feedback.maxDuration)
         elif practice_feedback.forceEnded:
             routineTimer.reset()
         else:
-            routineTimer.addTime(-1.500000)
+            routineTimer.addTime(-feedbackFrames * frameDur)
         thisExp.nextEntry()
         
     # completed n_practice_reps repeats of 'practice_no_time'
@@ -1338,7 +1443,6 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     # create starting attributes for key_resp_5
     key_resp_5.keys = []
     key_resp_5.rt = []
-    _key_resp_5_allKeys = []
     # store start times for instr3
     instr3.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
     instr3.tStart = globalClock.getTime(format='float')
@@ -1347,6 +1451,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     instr3.maxDuration = None
     # keep track of which components have finished
     instr3Components = instr3.components
+    # components with a status, filtered once here rather than on every frame
+    instr3StatusComponents = [
+        thisComponent for thisComponent in instr3.components if hasattr(thisComponent, 'status')
+    ]
+    # stims to switch off when the routine ends, filtered alongside the above
+    instr3DrawComponents = [
+        thisComponent for thisComponent in instr3.components if hasattr(thisComponent, 'setAutoDraw')
+    ]
+    # counted down as each one finishes, so the end-of-frame check is one compare
+    instr3Unfinished = len(instr3StatusComponents)
     for thisComponent in instr3.components:
         thisComponent.tStart = None
         thisComponent.tStop = None
@@ -1363,62 +1477,53 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     instr3.forceEnded = routineForceEnded = not continueRoutine
     while continueRoutine:
         # get current time
-        t = routineTimer.getTime()
-        tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-        tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+        t = getRoutineTime()
+        # components all start on the first frame, so only the global flip time is needed
+        tThisFlipGlobal = getFutureFlipTime(clock=None)
         frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
         # update/draw components on each frame
         
         # *text_8* updates
         
         # if text_8 is starting this frame...
-        if text_8.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if text_8.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             text_8.frameNStart = frameN  # exact frame index
             text_8.tStart = t  # local t and not account for scr refresh
             text_8.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(text_8, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'text_8.started')
             # update status
             text_8.status = STARTED
             text_8.setAutoDraw(True)
         
-        # if text_8 is active this frame...
-        if text_8.status == STARTED:
-            # update params
-            pass
-        
         # *key_resp_5* updates
         waitOnFlip = False
         
         # if key_resp_5 is starting this frame...
-        if key_resp_5.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if key_resp_5.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             key_resp_5.frameNStart = frameN  # exact frame index
             key_resp_5.tStart = t  # local t and not account for scr refresh
             key_resp_5.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(key_resp_5, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'key_resp_5.started')
             # update status
             key_resp_5.status = STARTED
             # keyboard checking is just starting
             waitOnFlip = True
-            win.callOnFlip(key_resp_5.clock.reset)  # t=0 on next screen flip
-            win.callOnFlip(key_resp_5.clearEvents, eventType='keyboard')  # clear events on next screen flip
+            win.callOnFlip(startKeyboardOnFlip, key_resp_5)  # t=0 and clear events on next screen flip
         if key_resp_5.status == STARTED and not waitOnFlip:
             theseKeys = key_resp_5.getKeys(keyList=['space'], ignoreKeys=["escape"], waitRelease=False)
-            _key_resp_5_allKeys.extend(theseKeys)
-            if len(_key_resp_5_allKeys):
-                key_resp_5.keys = _key_resp_5_allKeys[-1].name  # just the last key pressed
-                key_resp_5.rt = _key_resp_5_allKeys[-1].rt
-                key_resp_5.duration = _key_resp_5_allKeys[-1].duration
+            # the first response ends the routine, so only this call's last key is kept
+            if theseKeys:
+                lastKey = theseKeys[-1]  # just the last key pressed
+                key_resp_5.keys = lastKey.name
+                key_resp_5.rt = lastKey.rt
+                key_resp_5.duration = lastKey.duration
                 # a response ends the routine
                 continueRoutine = False
         
         # check for quit (typically the Esc key)
-        if defaultKeyboard.getKeys(keyList=["escape"]):
+        if escapePressed():
             thisExp.status = FINISHED
         if thisExp.status == FINISHED or endExpNow:
             endExperiment(thisExp, win=win)
@@ -1438,24 +1543,22 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         if not continueRoutine:  # a component has requested a forced-end of Routine
             instr3.forceEnded = routineForceEnded = True
             break
-        continueRoutine = False  # will revert to True if at least one component still running
-        for thisComponent in instr3.components:
-            if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                continueRoutine = True
-                break  # at least one component has not yet finished
+        # True if at least one component still running
+        continueRoutine = instr3Unfinished > 0
         
         # refresh the screen
         if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-            win.flip()
+            flip()
     
     # --- Ending Routine "instr3" ---
-    for thisComponent in instr3.components:
-        if hasattr(thisComponent, "setAutoDraw"):
-            thisComponent.setAutoDraw(False)
+    for thisComponent in instr3DrawComponents:
+        thisComponent.setAutoDraw(False)
     # store stop times for instr3
     instr3.tStop = globalClock.getTime(format='float')
     instr3.tStopRefresh = tThisFlipGlobal
     thisExp.addData('instr3.stopped', instr3.tStop)
+    addRefreshTimes(thisExp, 'text_8', text_8)
+    addRefreshTimes(thisExp, 'key_resp_5', key_resp_5)
     # check responses
     if key_resp_5.keys in ['', [], None]:  # No response was made
         key_resp_5.keys = None
@@ -1481,8 +1584,10 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     thisPractice_timed = practice_timed.trialList[0]  # so we can initialise stimuli with some values
     # abbreviate parameter names if possible (e.g. rgb = thisPractice_timed.rgb)
     if thisPractice_timed != None:
-        for paramName in thisPractice_timed:
-            globals()[paramName] = thisPractice_timed[paramName]
+        center = thisPractice_timed['center']
+        surround = thisPractice_timed['surround']
+        correct = thisPractice_timed['correct']
+        opacity = thisPractice_timed['opacity']
     if thisSession is not None:
         # if running in a Session with a Liaison client, send data up to now
         thisSession.sendExperimentData()
@@ -1495,8 +1600,10 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             thisSession.sendExperimentData()
         # abbreviate parameter names if possible (e.g. rgb = thisPractice_timed.rgb)
         if thisPractice_timed != None:
-            for paramName in thisPractice_timed:
-                globals()[paramName] = thisPractice_timed[paramName]
+            center = thisPractice_timed['center']
+            surround = thisPractice_timed['surround']
+            correct = thisPractice_timed['correct']
+            opacity = thisPractice_timed['opacity']
         
         # --- Prepare to start Routine "practice_trial_timed" ---
         # create an object to store info about Routine practice_trial_timed
@@ -1508,15 +1615,15 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         continueRoutine = True
         # update component parameters for each repeat
         surround_practice_2.setOpacity(opacity)
-        surround_practice_2.setSize(surround_size)
-        surround_practice_2.setOri(surround)
-        surround_practice_2.setSF(surround_sf)
-        center_practice_2.setOri(center)
-        center_practice_2.setSF(center_sf)
+        surround_practice_2.size = surround_size
+        surround_practice_2.ori = surround
+        surround_practice_2.sf = surround_sf
+        center_practice_2.ori = center
+        center_practice_2.sf = center_sf
         # create starting attributes for key_resp_4
         key_resp_4.keys = []
         key_resp_4.rt = []
-        _key_resp_4_allKeys = []
+        correctKey = str(correct)
         # store start times for practice_trial_timed
         practice_trial_timed.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
         practice_trial_timed.tStart = globalClock.getTime(format='float')
@@ -1525,6 +1632,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_trial_timed.maxDuration = None
         # keep track of which components have finished
         practice_trial_timedComponents = practice_trial_timed.components
+        # components with a status, filtered once here rather than on every frame
+        practice_trial_timedStatusComponents = [
+            thisComponent for thisComponent in practice_trial_timed.components if hasattr(thisComponent, 'status')
+        ]
+        # stims to switch off when the routine ends, filtered alongside the above
+        practice_trial_timedDrawComponents = [
+            thisComponent for thisComponent in practice_trial_timed.components if hasattr(thisComponent, 'setAutoDraw')
+        ]
+        # counted down as each one finishes, so the end-of-frame check is one compare
+        practice_trial_timedUnfinished = len(practice_trial_timedStatusComponents)
         for thisComponent in practice_trial_timed.components:
             thisComponent.tStart = None
             thisComponent.tStop = None
@@ -1544,135 +1661,110 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_trial_timed.forceEnded = routineForceEnded = not continueRoutine
         while continueRoutine:
             # get current time
-            t = routineTimer.getTime()
-            tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-            tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+            t = getRoutineTime()
+            # every onset here is scheduled in frames, so only the global flip time
+            # (for the refresh timestamps) has to be predicted
+            tThisFlipGlobal = getFutureFlipTime(clock=None)
             frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
             # update/draw components on each frame
             
             # *surround_practice_2* updates
             
             # if surround_practice_2 is starting this frame...
-            if surround_practice_2.status == NOT_STARTED and tThisFlip >= 0.5-frameTolerance:
+            if surround_practice_2.status == NOT_STARTED and frameN >= flashStartFrame:
                 # keep track of start time/frame for later
                 surround_practice_2.frameNStart = frameN  # exact frame index
                 surround_practice_2.tStart = t  # local t and not account for scr refresh
                 surround_practice_2.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(surround_practice_2, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'surround_practice_2.started')
                 # update status
                 surround_practice_2.status = STARTED
                 surround_practice_2.setAutoDraw(True)
             
-            # if surround_practice_2 is active this frame...
-            if surround_practice_2.status == STARTED:
-                # update params
-                pass
-            
             # if surround_practice_2 is stopping this frame...
             if surround_practice_2.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > surround_practice_2.tStartRefresh + 0.08-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= surround_practice_2.frameNStart + flashFrames:
                     # keep track of stop time/frame for later
                     surround_practice_2.tStop = t  # not accounting for scr refresh
                     surround_practice_2.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(surround_practice_2, 'tStopRefresh')  # time at next scr refresh
                     surround_practice_2.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'surround_practice_2.stopped')
                     # update status
                     surround_practice_2.status = FINISHED
+                    practice_trial_timedUnfinished -= 1
                     surround_practice_2.setAutoDraw(False)
             
             # *center_practice_2* updates
             
             # if center_practice_2 is starting this frame...
-            if center_practice_2.status == NOT_STARTED and tThisFlip >= 0.5-frameTolerance:
+            if center_practice_2.status == NOT_STARTED and frameN >= flashStartFrame:
                 # keep track of start time/frame for later
                 center_practice_2.frameNStart = frameN  # exact frame index
                 center_practice_2.tStart = t  # local t and not account for scr refresh
                 center_practice_2.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(center_practice_2, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'center_practice_2.started')
                 # update status
                 center_practice_2.status = STARTED
                 center_practice_2.setAutoDraw(True)
             
-            # if center_practice_2 is active this frame...
-            if center_practice_2.status == STARTED:
-                # update params
-                pass
-            
             # if center_practice_2 is stopping this frame...
             if center_practice_2.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > center_practice_2.tStartRefresh + 0.08-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= center_practice_2.frameNStart + flashFrames:
                     # keep track of stop time/frame for later
                     center_practice_2.tStop = t  # not accounting for scr refresh
                     center_practice_2.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(center_practice_2, 'tStopRefresh')  # time at next scr refresh
                     center_practice_2.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'center_practice_2.stopped')
                     # update status
                     center_practice_2.status = FINISHED
+                    practice_trial_timedUnfinished -= 1
                     center_practice_2.setAutoDraw(False)
             
             # *key_resp_4* updates
             waitOnFlip = False
             
             # if key_resp_4 is starting this frame...
-            if key_resp_4.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+            if key_resp_4.status == NOT_STARTED and frameN >= 0:
                 # keep track of start time/frame for later
                 key_resp_4.frameNStart = frameN  # exact frame index
                 key_resp_4.tStart = t  # local t and not account for scr refresh
                 key_resp_4.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(key_resp_4, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'key_resp_4.started')
                 # update status
                 key_resp_4.status = STARTED
                 # keyboard checking is just starting
                 waitOnFlip = True
-                win.callOnFlip(key_resp_4.clock.reset)  # t=0 on next screen flip
-                win.callOnFlip(key_resp_4.clearEvents, eventType='keyboard')  # clear events on next screen flip
+                win.callOnFlip(startKeyboardOnFlip, key_resp_4)  # t=0 and clear events on next screen flip
             if key_resp_4.status == STARTED and not waitOnFlip:
                 theseKeys = key_resp_4.getKeys(keyList=['left','right'], ignoreKeys=["escape"], waitRelease=False)
-                _key_resp_4_allKeys.extend(theseKeys)
-                if len(_key_resp_4_allKeys):
-                    key_resp_4.keys = _key_resp_4_allKeys[-1].name  # just the last key pressed
-                    key_resp_4.rt = _key_resp_4_allKeys[-1].rt
-                    key_resp_4.duration = _key_resp_4_allKeys[-1].duration
+                # the first response ends the routine, so only this call's last key is kept
+                if theseKeys:
+                    lastKey = theseKeys[-1]  # just the last key pressed
+                    key_resp_4.keys = lastKey.name
+                    key_resp_4.rt = lastKey.rt
+                    key_resp_4.duration = lastKey.duration
                     # was this correct?
-                    if (key_resp_4.keys == str(correct)) or (key_resp_4.keys == correct):
-                        key_resp_4.corr = 1
-                    else:
-                        key_resp_4.corr = 0
+                    key_resp_4.corr = int(key_resp_4.keys == correctKey)
                     # a response ends the routine
                     continueRoutine = False
             
             # *text_12* updates
             
             # if text_12 is starting this frame...
-            if text_12.status == NOT_STARTED and tThisFlip >= 0.58-frameTolerance:
+            if text_12.status == NOT_STARTED and frameN >= arrowsStartFrame:
                 # keep track of start time/frame for later
                 text_12.frameNStart = frameN  # exact frame index
                 text_12.tStart = t  # local t and not account for scr refresh
                 text_12.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(text_12, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'text_12.started')
                 # update status
                 text_12.status = STARTED
                 text_12.setAutoDraw(True)
             
-            # if text_12 is active this frame...
-            if text_12.status == STARTED:
-                # update params
-                pass
-            
             # check for quit (typically the Esc key)
-            if defaultKeyboard.getKeys(keyList=["escape"]):
+            if escapePressed():
                 thisExp.status = FINISHED
             if thisExp.status == FINISHED or endExpNow:
                 endExperiment(thisExp, win=win)
@@ -1692,29 +1784,29 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             if not continueRoutine:  # a component has requested a forced-end of Routine
                 practice_trial_timed.forceEnded = routineForceEnded = True
                 break
-            continueRoutine = False  # will revert to True if at least one component still running
-            for thisComponent in practice_trial_timed.components:
-                if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                    continueRoutine = True
-                    break  # at least one component has not yet finished
+            # True if at least one component still running
+            continueRoutine = practice_trial_timedUnfinished > 0
             
             # refresh the screen
             if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-                win.flip()
+                flip()
         
         # --- Ending Routine "practice_trial_timed" ---
-        for thisComponent in practice_trial_timed.components:
-            if hasattr(thisComponent, "setAutoDraw"):
-                thisComponent.setAutoDraw(False)
+        for thisComponent in practice_trial_timedDrawComponents:
+            thisComponent.setAutoDraw(False)
         # store stop times for practice_trial_timed
         practice_trial_timed.tStop = globalClock.getTime(format='float')
         practice_trial_timed.tStopRefresh = tThisFlipGlobal
         thisExp.addData('practice_trial_timed.stopped', practice_trial_timed.tStop)
+        addRefreshTimes(thisExp, 'surround_practice_2', surround_practice_2)
+        addRefreshTimes(thisExp, 'center_practice_2', center_practice_2)
+        addRefreshTimes(thisExp, 'key_resp_4', key_resp_4)
+        addRefreshTimes(thisExp, 'text_12', text_12)
         # check responses
         if key_resp_4.keys in ['', [], None]:  # No response was made
             key_resp_4.keys = None
             # was no response the correct answer?!
-            if str(correct).lower() == 'none':
+            if correctKey.lower() == 'none':
                key_resp_4.corr = 1;  # correct non-response
             else:
                key_resp_4.corr = 0;  # failed to respond (incorrectly)
@@ -1728,6 +1820,12 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         routineTimer.reset()
         
         # --- Prepare to start Routine "practice_feedback" ---
+        # Run 'Begin Routine' code from code_2
+        if key_resp_3.corr == True:
+            msg = 'Correct'
+        else:
+            msg = 'Incorrect'
+        text_7 = text_7Stims[msg]
         # create an object to store info about Routine practice_feedback
         practice_feedback = data.Routine(
             name='practice_feedback',
@@ -1736,12 +1834,6 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_feedback.status = NOT_STARTED
         continueRoutine = True
         # update component parameters for each repeat
-        # Run 'Begin Routine' code from code_2
-        if key_resp_3.corr == True:
-            msg = 'Correct'
-        else:
-            msg = 'Incorrect'
-        text_7.setText(msg)
         # store start times for practice_feedback
         practice_feedback.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
         practice_feedback.tStart = globalClock.getTime(format='float')
@@ -1750,6 +1842,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         practice_feedback.maxDuration = None
         # keep track of which components have finished
         practice_feedbackComponents = practice_feedback.components
+        # components with a status, filtered once here rather than on every frame
+        practice_feedbackStatusComponents = [
+            thisComponent for thisComponent in practice_feedback.components if hasattr(thisComponent, 'status')
+        ]
+        # stims to switch off when the routine ends, filtered alongside the above
+        practice_feedbackDrawComponents = [
+            thisComponent for thisComponent in practice_feedback.components if hasattr(thisComponent, 'setAutoDraw')
+        ]
+        # counted down as each one finishes, so the end-of-frame check is one compare
+        practice_feedbackUnfinished = len(practice_feedbackStatusComponents)
         for thisComponent in practice_feedback.components:
             thisComponent.tStart = None
             thisComponent.tStop = None
@@ -1767,50 +1869,42 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         if isinstance(practice_timed, data.TrialHandler2) and thisPractice_timed.thisN != practice_timed.thisTrial.thisN:
             continueRoutine = False
         practice_feedback.forceEnded = routineForceEnded = not continueRoutine
-        while continueRoutine and routineTimer.getTime() < 1.5:
+        while continueRoutine:
             # get current time
-            t = routineTimer.getTime()
-            tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-            tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+            t = getRoutineTime()
+            tThisFlipGlobal = getFutureFlipTime(clock=None)
             frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
             # update/draw components on each frame
             
             # *text_7* updates
             
             # if text_7 is starting this frame...
-            if text_7.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+            if text_7.status == NOT_STARTED and frameN >= 0:
                 # keep track of start time/frame for later
                 text_7.frameNStart = frameN  # exact frame index
                 text_7.tStart = t  # local t and not account for scr refresh
                 text_7.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(text_7, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'text_7.started')
                 # update status
                 text_7.status = STARTED
                 text_7.setAutoDraw(True)
             
-            # if text_7 is active this frame...
-            if text_7.status == STARTED:
-                # update params
-                pass
-            
             # if text_7 is stopping this frame...
             if text_7.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > text_7.tStartRefresh + 1.5-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= text_7.frameNStart + feedbackFrames:
                     # keep track of stop time/frame for later
                     text_7.tStop = t  # not accounting for scr refresh
                     text_7.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(text_7, 'tStopRefresh')  # time at next scr refresh
                     text_7.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'text_7.stopped')
                     # update status
                     text_7.status = FINISHED
+                    practice_feedbackUnfinished -= 1
                     text_7.setAutoDraw(False)
             
             # check for quit (typically the Esc key)
-            if defaultKeyboard.getKeys(keyList=["escape"]):
+            if escapePressed():
                 thisExp.status = FINISHED
             if thisExp.status == FINISHED or endExpNow:
                 endExperiment(thisExp, win=win)
@@ -1830,31 +1924,28 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             if not continueRoutine:  # a component has requested a forced-end of Routine
                 practice_feedback.forceEnded = routineForceEnded = True
                 break
-            continueRoutine = False  # will revert to True if at least one component still running
-            for thisComponent in practice_feedback.components:
-                if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                    continueRoutine = True
-                    break  # at least one component has not yet finished
+            # True if at least one component still running
+            continueRoutine = practice_feedbackUnfinished > 0
             
             # refresh the screen
             if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-                win.flip()
+                flip()
         
         # --- Ending Routine "practice_feedback" ---
-        for thisComponent in practice_feedback.components:
-            if hasattr(thisComponent, "setAutoDraw"):
-                thisComponent.setAutoDraw(False)
+        for thisComponent in practice_feedbackDrawComponents:
+            thisComponent.setAutoDraw(False)
         # store stop times for practice_feedback
         practice_feedback.tStop = globalClock.getTime(format='float')
         practice_feedback.tStopRefresh = tThisFlipGlobal
         thisExp.addData('practice_feedback.stopped', practice_feedback.tStop)
+        addRefreshTimes(thisExp, 'text_7', text_7)
         # using non-slip timing so subtract the expected duration of this Routine (unless ended on request)
         if practice_feedback.maxDurationReached:
             routineTimer.addTime(-practice_feedback.maxDuration)
         elif practice_feedback.forceEnded:
             routineTimer.reset()
         else:
-            routineTimer.addTime(-1.500000)
+            routineTimer.addTime(-feedbackFrames * frameDur)
         thisExp.nextEntry()
         
     # completed n_practice_reps repeats of 'practice_timed'
@@ -1875,7 +1966,6 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     # create starting attributes for key_resp_8
     key_resp_8.keys = []
     key_resp_8.rt = []
-    _key_resp_8_allKeys = []
     # store start times for start_instr
     start_instr.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
     start_instr.tStart = globalClock.getTime(format='float')
@@ -1884,6 +1974,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     start_instr.maxDuration = None
     # keep track of which components have finished
     start_instrComponents = start_instr.components
+    # components with a status, filtered once here rather than on every frame
+    start_instrStatusComponents = [
+        thisComponent for thisComponent in start_instr.components if hasattr(thisComponent, 'status')
+    ]
+    # stims to switch off when the routine ends, filtered alongside the above
+    start_instrDrawComponents = [
+        thisComponent for thisComponent in start_instr.components if hasattr(thisComponent, 'setAutoDraw')
+    ]
+    # counted down as each one finishes, so the end-of-frame check is one compare
+    start_instrUnfinished = len(start_instrStatusComponents)
     for thisComponent in start_instr.components:
         thisComponent.tStart = None
         thisComponent.tStop = None
@@ -1900,62 +2000,52 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     start_instr.forceEnded = routineForceEnded = not continueRoutine
     while continueRoutine:
         # get current time
-        t = routineTimer.getTime()
-        tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-        tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+        t = getRoutineTime()
+        tThisFlipGlobal = getFutureFlipTime(clock=None)
         frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
         # update/draw components on each frame
         
         # *text_13* updates
         
         # if text_13 is starting this frame...
-        if text_13.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if text_13.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             text_13.frameNStart = frameN  # exact frame index
             text_13.tStart = t  # local t and not account for scr refresh
             text_13.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(text_13, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'text_13.started')
             # update status
             text_13.status = STARTED
             text_13.setAutoDraw(True)
         
-        # if text_13 is active this frame...
-        if text_13.status == STARTED:
-            # update params
-            pass
-        
         # *key_resp_8* updates
         waitOnFlip = False
         
         # if key_resp_8 is starting this frame...
-        if key_resp_8.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if key_resp_8.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             key_resp_8.frameNStart = frameN  # exact frame index
             key_resp_8.tStart = t  # local t and not account for scr refresh
             key_resp_8.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(key_resp_8, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'key_resp_8.started')
             # update status
             key_resp_8.status = STARTED
             # keyboard checking is just starting
             waitOnFlip = True
-            win.callOnFlip(key_resp_8.clock.reset)  # t=0 on next screen flip
-            win.callOnFlip(key_resp_8.clearEvents, eventType='keyboard')  # clear events on next screen flip
+            win.callOnFlip(startKeyboardOnFlip, key_resp_8)  # t=0 and clear events on next screen flip
         if key_resp_8.status == STARTED and not waitOnFlip:
             theseKeys = key_resp_8.getKeys(keyList=['space'], ignoreKeys=["escape"], waitRelease=False)
-            _key_resp_8_allKeys.extend(theseKeys)
-            if len(_key_resp_8_allKeys):
-                key_resp_8.keys = _key_resp_8_allKeys[-1].name  # just the last key pressed
-                key_resp_8.rt = _key_resp_8_allKeys[-1].rt
-                key_resp_8.duration = _key_resp_8_allKeys[-1].duration
+            # the first response ends the routine, so only this call's last key is kept
+            if theseKeys:
+                lastKey = theseKeys[-1]  # just the last key pressed
+                key_resp_8.keys = lastKey.name
+                key_resp_8.rt = lastKey.rt
+                key_resp_8.duration = lastKey.duration
                 # a response ends the routine
                 continueRoutine = False
         
         # check for quit (typically the Esc key)
-        if defaultKeyboard.getKeys(keyList=["escape"]):
+        if escapePressed():
             thisExp.status = FINISHED
         if thisExp.status == FINISHED or endExpNow:
             endExperiment(thisExp, win=win)
@@ -1975,24 +2065,22 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         if not continueRoutine:  # a component has requested a forced-end of Routine
             start_instr.forceEnded = routineForceEnded = True
             break
-        continueRoutine = False  # will revert to True if at least one component still running
-        for thisComponent in start_instr.components:
-            if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                continueRoutine = True
-                break  # at least one component has not yet finished
+        # True if at least one component still running
+        continueRoutine = start_instrUnfinished > 0
         
         # refresh the screen
         if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-            win.flip()
+            flip()
     
     # --- Ending Routine "start_instr" ---
-    for thisComponent in start_instr.components:
-        if hasattr(thisComponent, "setAutoDraw"):
-            thisComponent.setAutoDraw(False)
+    for thisComponent in start_instrDrawComponents:
+        thisComponent.setAutoDraw(False)
     # store stop times for start_instr
     start_instr.tStop = globalClock.getTime(format='float')
     start_instr.tStopRefresh = tThisFlipGlobal
     thisExp.addData('start_instr.stopped', start_instr.tStop)
+    addRefreshTimes(thisExp, 'text_13', text_13)
+    addRefreshTimes(thisExp, 'key_resp_8', key_resp_8)
     # check responses
     if key_resp_8.keys in ['', [], None]:  # No response was made
         key_resp_8.keys = None
@@ -2018,12 +2106,15 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     thisTrial = trials.trialList[0]  # so we can initialise stimuli with some values
     # abbreviate parameter names if possible (e.g. rgb = thisTrial.rgb)
     if thisTrial != None:
-        for paramName in thisTrial:
-            globals()[paramName] = thisTrial[paramName]
+        center = thisTrial['center']
+        surround = thisTrial['surround']
+        surr_opacity = thisTrial['surr_opacity']
     if thisSession is not None:
         # if running in a Session with a Liaison client, send data up to now
         thisSession.sendExperimentData()
     
+    # draw the (center, surround) phases for every trial of the loop in one call
+    trialPhases = phaseRng.random((trials.nTotal, 2))
     for thisTrial in trials:
         currentLoop = trials
         thisExp.timestampOnFlip(win, 'thisRow.t', format=globalClock.format)
@@ -2032,8 +2123,9 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             thisSession.sendExperimentData()
         # abbreviate parameter names if possible (e.g. rgb = thisTrial.rgb)
         if thisTrial != None:
-            for paramName in thisTrial:
-                globals()[paramName] = thisTrial[paramName]
+            center = thisTrial['center']
+            surround = thisTrial['surround']
+            surr_opacity = thisTrial['surr_opacity']
         
         # --- Prepare to start Routine "trial" ---
         # create an object to store info about Routine trial
@@ -2045,21 +2137,19 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         continueRoutine = True
         # update component parameters for each repeat
         # Run 'Begin Routine' code from set_phase
-        center_phase = random.random()
-        surround_phase = random.random()
+        center_phase, surround_phase = trialPhases[trials.thisN]
         surround_grating.setOpacity(surr_opacity)
-        surround_grating.setSize(surround_size)
-        surround_grating.setOri(surround)
-        surround_grating.setSF(surround_sf)
-        surround_grating.setPhase(surround_phase)
-        center_grating.setSize(center_size)
-        center_grating.setOri(center)
-        center_grating.setSF(center_sf)
-        center_grating.setPhase(center_phase)
+        surround_grating.size = surround_size
+        surround_grating.ori = surround
+        surround_grating.sf = surround_sf
+        surround_grating.phase = surround_phase
+        center_grating.size = center_size
+        center_grating.ori = center
+        center_grating.sf = center_sf
+        center_grating.phase = center_phase
         # create starting attributes for resp
         resp.keys = []
         resp.rt = []
-        _resp_allKeys = []
         # store start times for trial
         trial.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
         trial.tStart = globalClock.getTime(format='float')
@@ -2068,6 +2158,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         trial.maxDuration = None
         # keep track of which components have finished
         trialComponents = trial.components
+        # components with a status, filtered once here rather than on every frame
+        trialStatusComponents = [
+            thisComponent for thisComponent in trial.components if hasattr(thisComponent, 'status')
+        ]
+        # stims to switch off when the routine ends, filtered alongside the above
+        trialDrawComponents = [
+            thisComponent for thisComponent in trial.components if hasattr(thisComponent, 'setAutoDraw')
+        ]
+        # counted down as each one finishes, so the end-of-frame check is one compare
+        trialUnfinished = len(trialStatusComponents)
         for thisComponent in trial.components:
             thisComponent.tStart = None
             thisComponent.tStop = None
@@ -2087,110 +2187,95 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         trial.forceEnded = routineForceEnded = not continueRoutine
         while continueRoutine:
             # get current time
-            t = routineTimer.getTime()
-            tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-            tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+            t = getRoutineTime()
+            # every onset here is scheduled in frames, so only the global flip time
+            # (for the refresh timestamps) has to be predicted
+            tThisFlipGlobal = getFutureFlipTime(clock=None)
             frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
             # update/draw components on each frame
             
             # *surround_grating* updates
             
             # if surround_grating is starting this frame...
-            if surround_grating.status == NOT_STARTED and tThisFlip >= 0.5-frameTolerance:
+            if surround_grating.status == NOT_STARTED and frameN >= flashStartFrame:
                 # keep track of start time/frame for later
                 surround_grating.frameNStart = frameN  # exact frame index
                 surround_grating.tStart = t  # local t and not account for scr refresh
                 surround_grating.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(surround_grating, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'surround_grating.started')
                 # update status
                 surround_grating.status = STARTED
                 surround_grating.setAutoDraw(True)
             
-            # if surround_grating is active this frame...
-            if surround_grating.status == STARTED:
-                # update params
-                pass
-            
             # if surround_grating is stopping this frame...
             if surround_grating.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > surround_grating.tStartRefresh + 0.08-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= surround_grating.frameNStart + flashFrames:
                     # keep track of stop time/frame for later
                     surround_grating.tStop = t  # not accounting for scr refresh
                     surround_grating.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(surround_grating, 'tStopRefresh')  # time at next scr refresh
                     surround_grating.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'surround_grating.stopped')
                     # update status
                     surround_grating.status = FINISHED
+                    trialUnfinished -= 1
                     surround_grating.setAutoDraw(False)
             
             # *center_grating* updates
             
             # if center_grating is starting this frame...
-            if center_grating.status == NOT_STARTED and tThisFlip >= 0.5-frameTolerance:
+            if center_grating.status == NOT_STARTED and frameN >= flashStartFrame:
                 # keep track of start time/frame for later
                 center_grating.frameNStart = frameN  # exact frame index
                 center_grating.tStart = t  # local t and not account for scr refresh
                 center_grating.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(center_grating, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'center_grating.started')
                 # update status
                 center_grating.status = STARTED
                 center_grating.setAutoDraw(True)
             
-            # if center_grating is active this frame...
-            if center_grating.status == STARTED:
-                # update params
-                pass
-            
             # if center_grating is stopping this frame...
             if center_grating.status == STARTED:
-                # is it time to stop? (based on global clock, using actual start)
-                if tThisFlipGlobal > center_grating.tStartRefresh + 0.08-frameTolerance:
+                # is it time to stop? (based on frames since its start frame)
+                if frameN >= center_grating.frameNStart + flashFrames:
                     # keep track of stop time/frame for later
                     center_grating.tStop = t  # not accounting for scr refresh
                     center_grating.tStopRefresh = tThisFlipGlobal  # on global time
+                    win.timeOnFlip(center_grating, 'tStopRefresh')  # time at next scr refresh
                     center_grating.frameNStop = frameN  # exact frame index
-                    # add timestamp to datafile
-                    thisExp.timestampOnFlip(win, 'center_grating.stopped')
                     # update status
                     center_grating.status = FINISHED
+                    trialUnfinished -= 1
                     center_grating.setAutoDraw(False)
             
             # *resp* updates
             waitOnFlip = False
             
             # if resp is starting this frame...
-            if resp.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+            if resp.status == NOT_STARTED and frameN >= 0:
                 # keep track of start time/frame for later
                 resp.frameNStart = frameN  # exact frame index
                 resp.tStart = t  # local t and not account for scr refresh
                 resp.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(resp, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'resp.started')
                 # update status
                 resp.status = STARTED
                 # keyboard checking is just starting
                 waitOnFlip = True
-                win.callOnFlip(resp.clock.reset)  # t=0 on next screen flip
-                win.callOnFlip(resp.clearEvents, eventType='keyboard')  # clear events on next screen flip
+                win.callOnFlip(startKeyboardOnFlip, resp)  # t=0 and clear events on next screen flip
             if resp.status == STARTED and not waitOnFlip:
-                theseKeys = resp.getKeys(keyList=['left','right'], ignoreKeys=["escape"], waitRelease=False)
-                _resp_allKeys.extend(theseKeys)
-                if len(_resp_allKeys):
-                    resp.keys = _resp_allKeys[-1].name  # just the last key pressed
-                    resp.rt = _resp_allKeys[-1].rt
-                    resp.duration = _resp_allKeys[-1].duration
+                theseKeys = resp.getKeys(keyList=respKeyList, ignoreKeys=escapeKeyList, waitRelease=False)
+                # the first response ends the routine, so only this call's last key is kept
+                if theseKeys:
+                    lastKey = theseKeys[-1]  # just the last key pressed
+                    resp.keys = lastKey.name
+                    resp.rt = lastKey.rt
+                    resp.duration = lastKey.duration
                     # a response ends the routine
                     continueRoutine = False
             
             # check for quit (typically the Esc key)
-            if defaultKeyboard.getKeys(keyList=["escape"]):
+            if escapePressed():
                 thisExp.status = FINISHED
             if thisExp.status == FINISHED or endExpNow:
                 endExperiment(thisExp, win=win)
@@ -2210,24 +2295,23 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             if not continueRoutine:  # a component has requested a forced-end of Routine
                 trial.forceEnded = routineForceEnded = True
                 break
-            continueRoutine = False  # will revert to True if at least one component still running
-            for thisComponent in trial.components:
-                if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                    continueRoutine = True
-                    break  # at least one component has not yet finished
+            # True if at least one component still running
+            continueRoutine = trialUnfinished > 0
             
             # refresh the screen
             if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-                win.flip()
+                flip()
         
         # --- Ending Routine "trial" ---
-        for thisComponent in trial.components:
-            if hasattr(thisComponent, "setAutoDraw"):
-                thisComponent.setAutoDraw(False)
+        for thisComponent in trialDrawComponents:
+            thisComponent.setAutoDraw(False)
         # store stop times for trial
         trial.tStop = globalClock.getTime(format='float')
         trial.tStopRefresh = tThisFlipGlobal
         thisExp.addData('trial.stopped', trial.tStop)
+        addRefreshTimes(thisExp, 'surround_grating', surround_grating)
+        addRefreshTimes(thisExp, 'center_grating', center_grating)
+        addRefreshTimes(thisExp, 'resp', resp)
         # check responses
         if resp.keys in ['', [], None]:  # No response was made
             resp.keys = None
@@ -2248,12 +2332,11 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         continueRoutine = True
         # update component parameters for each repeat
         # Run 'Begin Routine' code from code_5
-        if not trials.thisTrialN in [100, 300, 500]:
+        if trials.thisTrialN not in breakTrialNs:
             continueRoutine = False
         # create starting attributes for key_resp_10
         key_resp_10.keys = []
         key_resp_10.rt = []
-        _key_resp_10_allKeys = []
         # store start times for break_2
         break_2.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
         break_2.tStart = globalClock.getTime(format='float')
@@ -2262,6 +2345,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         break_2.maxDuration = None
         # keep track of which components have finished
         break_2Components = break_2.components
+        # components with a status, filtered once here rather than on every frame
+        break_2StatusComponents = [
+            thisComponent for thisComponent in break_2.components if hasattr(thisComponent, 'status')
+        ]
+        # stims to switch off when the routine ends, filtered alongside the above
+        break_2DrawComponents = [
+            thisComponent for thisComponent in break_2.components if hasattr(thisComponent, 'setAutoDraw')
+        ]
+        # counted down as each one finishes, so the end-of-frame check is one compare
+        break_2Unfinished = len(break_2StatusComponents)
         for thisComponent in break_2.components:
             thisComponent.tStart = None
             thisComponent.tStop = None
@@ -2281,62 +2374,52 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         break_2.forceEnded = routineForceEnded = not continueRoutine
         while continueRoutine:
             # get current time
-            t = routineTimer.getTime()
-            tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-            tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+            t = getRoutineTime()
+            tThisFlipGlobal = getFutureFlipTime(clock=None)
             frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
             # update/draw components on each frame
             
             # *text_2* updates
             
             # if text_2 is starting this frame...
-            if text_2.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+            if text_2.status == NOT_STARTED and frameN >= 0:
                 # keep track of start time/frame for later
                 text_2.frameNStart = frameN  # exact frame index
                 text_2.tStart = t  # local t and not account for scr refresh
                 text_2.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(text_2, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'text_2.started')
                 # update status
                 text_2.status = STARTED
                 text_2.setAutoDraw(True)
             
-            # if text_2 is active this frame...
-            if text_2.status == STARTED:
-                # update params
-                pass
-            
             # *key_resp_10* updates
             waitOnFlip = False
             
             # if key_resp_10 is starting this frame...
-            if key_resp_10.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+            if key_resp_10.status == NOT_STARTED and frameN >= 0:
                 # keep track of start time/frame for later
                 key_resp_10.frameNStart = frameN  # exact frame index
                 key_resp_10.tStart = t  # local t and not account for scr refresh
                 key_resp_10.tStartRefresh = tThisFlipGlobal  # on global time
                 win.timeOnFlip(key_resp_10, 'tStartRefresh')  # time at next scr refresh
-                # add timestamp to datafile
-                thisExp.timestampOnFlip(win, 'key_resp_10.started')
                 # update status
                 key_resp_10.status = STARTED
                 # keyboard checking is just starting
                 waitOnFlip = True
-                win.callOnFlip(key_resp_10.clock.reset)  # t=0 on next screen flip
-                win.callOnFlip(key_resp_10.clearEvents, eventType='keyboard')  # clear events on next screen flip
+                win.callOnFlip(startKeyboardOnFlip, key_resp_10)  # t=0 and clear events on next screen flip
             if key_resp_10.status == STARTED and not waitOnFlip:
-                theseKeys = key_resp_10.getKeys(keyList=['space'], ignoreKeys=["escape"], waitRelease=False)
-                _key_resp_10_allKeys.extend(theseKeys)
-                if len(_key_resp_10_allKeys):
-                    key_resp_10.keys = _key_resp_10_allKeys[-1].name  # just the last key pressed
-                    key_resp_10.rt = _key_resp_10_allKeys[-1].rt
-                    key_resp_10.duration = _key_resp_10_allKeys[-1].duration
+                theseKeys = key_resp_10.getKeys(keyList=key_resp_10KeyList, ignoreKeys=escapeKeyList, waitRelease=False)
+                # the first response ends the routine, so only this call's last key is kept
+                if theseKeys:
+                    lastKey = theseKeys[-1]  # just the last key pressed
+                    key_resp_10.keys = lastKey.name
+                    key_resp_10.rt = lastKey.rt
+                    key_resp_10.duration = lastKey.duration
                     # a response ends the routine
                     continueRoutine = False
             
             # check for quit (typically the Esc key)
-            if defaultKeyboard.getKeys(keyList=["escape"]):
+            if escapePressed():
                 thisExp.status = FINISHED
             if thisExp.status == FINISHED or endExpNow:
                 endExperiment(thisExp, win=win)
@@ -2356,24 +2439,26 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
             if not continueRoutine:  # a component has requested a forced-end of Routine
                 break_2.forceEnded = routineForceEnded = True
                 break
-            continueRoutine = False  # will revert to True if at least one component still running
-            for thisComponent in break_2.components:
-                if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                    continueRoutine = True
-                    break  # at least one component has not yet finished
+            # True if at least one component still running
+            continueRoutine = break_2Unfinished > 0
             
             # refresh the screen
             if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-                win.flip()
+                if text_2.status == STARTED and frameN > text_2.frameNStart:
+                    # the break text has been flipped on and nothing changes, so sleep for a 
+                    # couple of frames between flips (keys stay buffered for the checks above)
+                    core.wait(2 * frameDur, hogCPUperiod=0)
+                flip()
         
         # --- Ending Routine "break_2" ---
-        for thisComponent in break_2.components:
-            if hasattr(thisComponent, "setAutoDraw"):
-                thisComponent.setAutoDraw(False)
+        for thisComponent in break_2DrawComponents:
+            thisComponent.setAutoDraw(False)
         # store stop times for break_2
         break_2.tStop = globalClock.getTime(format='float')
         break_2.tStopRefresh = tThisFlipGlobal
         thisExp.addData('break_2.stopped', break_2.tStop)
+        addRefreshTimes(thisExp, 'text_2', text_2)
+        addRefreshTimes(thisExp, 'key_resp_10', key_resp_10)
         # check responses
         if key_resp_10.keys in ['', [], None]:  # No response was made
             key_resp_10.keys = None
@@ -2403,7 +2488,6 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     # create starting attributes for key_resp
     key_resp.keys = []
     key_resp.rt = []
-    _key_resp_allKeys = []
     # store start times for end
     end.tStartRefresh = win.getFutureFlipTime(clock=globalClock)
     end.tStart = globalClock.getTime(format='float')
@@ -2412,6 +2496,16 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     end.maxDuration = None
     # keep track of which components have finished
     endComponents = end.components
+    # components with a status, filtered once here rather than on every frame
+    endStatusComponents = [
+        thisComponent for thisComponent in end.components if hasattr(thisComponent, 'status')
+    ]
+    # stims to switch off when the routine ends, filtered alongside the above
+    endDrawComponents = [
+        thisComponent for thisComponent in end.components if hasattr(thisComponent, 'setAutoDraw')
+    ]
+    # counted down as each one finishes, so the end-of-frame check is one compare
+    endUnfinished = len(endStatusComponents)
     for thisComponent in end.components:
         thisComponent.tStart = None
         thisComponent.tStop = None
@@ -2428,62 +2522,52 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
     end.forceEnded = routineForceEnded = not continueRoutine
     while continueRoutine:
         # get current time
-        t = routineTimer.getTime()
-        tThisFlip = win.getFutureFlipTime(clock=routineTimer)
-        tThisFlipGlobal = win.getFutureFlipTime(clock=None)
+        t = getRoutineTime()
+        tThisFlipGlobal = getFutureFlipTime(clock=None)
         frameN = frameN + 1  # number of completed frames (so 0 is the first frame)
         # update/draw components on each frame
         
         # *text_14* updates
         
         # if text_14 is starting this frame...
-        if text_14.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if text_14.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             text_14.frameNStart = frameN  # exact frame index
             text_14.tStart = t  # local t and not account for scr refresh
             text_14.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(text_14, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'text_14.started')
             # update status
             text_14.status = STARTED
             text_14.setAutoDraw(True)
         
-        # if text_14 is active this frame...
-        if text_14.status == STARTED:
-            # update params
-            pass
-        
         # *key_resp* updates
         waitOnFlip = False
         
         # if key_resp is starting this frame...
-        if key_resp.status == NOT_STARTED and tThisFlip >= 0.0-frameTolerance:
+        if key_resp.status == NOT_STARTED and frameN >= 0:
             # keep track of start time/frame for later
             key_resp.frameNStart = frameN  # exact frame index
             key_resp.tStart = t  # local t and not account for scr refresh
             key_resp.tStartRefresh = tThisFlipGlobal  # on global time
             win.timeOnFlip(key_resp, 'tStartRefresh')  # time at next scr refresh
-            # add timestamp to datafile
-            thisExp.timestampOnFlip(win, 'key_resp.started')
             # update status
             key_resp.status = STARTED
             # keyboard checking is just starting
             waitOnFlip = True
-            win.callOnFlip(key_resp.clock.reset)  # t=0 on next screen flip
-            win.callOnFlip(key_resp.clearEvents, eventType='keyboard')  # clear events on next screen flip
+            win.callOnFlip(startKeyboardOnFlip, key_resp)  # t=0 and clear events on next screen flip
         if key_resp.status == STARTED and not waitOnFlip:
-            theseKeys = key_resp.getKeys(keyList=['y','n','left','right','space'], ignoreKeys=["escape"], waitRelease=False)
-            _key_resp_allKeys.extend(theseKeys)
-            if len(_key_resp_allKeys):
-                key_resp.keys = _key_resp_allKeys[-1].name  # just the last key pressed
-                key_resp.rt = _key_resp_allKeys[-1].rt
-                key_resp.duration = _key_resp_allKeys[-1].duration
+            theseKeys = key_resp.getKeys(keyList=key_respKeyList, ignoreKeys=escapeKeyList, waitRelease=False)
+            # the first response ends the routine, so only this call's last key is kept
+            if theseKeys:
+                lastKey = theseKeys[-1]  # just the last key pressed
+                key_resp.keys = lastKey.name
+                key_resp.rt = lastKey.rt
+                key_resp.duration = lastKey.duration
                 # a response ends the routine
                 continueRoutine = False
         
         # check for quit (typically the Esc key)
-        if defaultKeyboard.getKeys(keyList=["escape"]):
+        if escapePressed():
             thisExp.status = FINISHED
         if thisExp.status == FINISHED or endExpNow:
             endExperiment(thisExp, win=win)
@@ -2503,24 +2587,26 @@ def run(expInfo, thisExp, win, globalClock=None, thisSession=None):
         if not continueRoutine:  # a component has requested a forced-end of Routine
             end.forceEnded = routineForceEnded = True
             break
-        continueRoutine = False  # will revert to True if at least one component still running
-        for thisComponent in end.components:
-            if hasattr(thisComponent, "status") and thisComponent.status != FINISHED:
-                continueRoutine = True
-                break  # at least one component has not yet finished
+        # True if at least one component still running
+        continueRoutine = endUnfinished > 0
         
         # refresh the screen
         if continueRoutine:  # don't flip if this routine is over or we'll get a blank screen
-            win.flip()
+            if text_14.status == STARTED and frameN > text_14.frameNStart:
+                # the end text has been flipped on and nothing changes, so sleep for a 
+                # couple of frames between flips (keys stay buffered for the checks above)
+                core.wait(2 * frameDur, hogCPUperiod=0)
+            flip()
     
     # --- Ending Routine "end" ---
-    for thisComponent in end.components:
-        if hasattr(thisComponent, "setAutoDraw"):
-            thisComponent.setAutoDraw(False)
+    for thisComponent in endDrawComponents:
+        thisComponent.setAutoDraw(False)
     # store stop times for end
     end.tStop = globalClock.getTime(format='float')
     end.tStopRefresh = tThisFlipGlobal
     thisExp.addData('end.stopped', end.tStop)
+    addRefreshTimes(thisExp, 'text_14', text_14)
+    addRefreshTimes(thisExp, 'key_resp', key_resp)
     # check responses
     if key_resp.keys in ['', [], None]:  # No response was made
         key_resp.keys = None
@@ -2549,7 +2635,8 @@ def saveData(thisExp):
     filename = thisExp.dataFileName
     # these shouldn't be strictly necessary (should auto-save)
     thisExp.saveAsWideText(filename + '.csv', delim='auto')
-    thisExp.saveAsPickle(filename)
+    if thisExp.savePickle:
+        thisExp.saveAsPickle(filename)
 
 
 def endExperiment(thisExp, win=None):
@@ -2572,6 +2659,8 @@ def endExperiment(thisExp, win=None):
         # Flip one final time so any remaining win.callOnFlip() 
         # and win.timeOnFlip() tasks get executed
         win.flip()
+    # return to normal process priority
+    core.rush(False)
     # return console logger level to WARNING
     logging.console.setLevel(logging.WARNING)
     # mark experiment handler as finished